@@ -3,8 +3,7 @@ os.environ["STREAMLIT_WATCHER_TYPE"] = "none"
 import streamlit as st
 from PIL import Image
 from pathlib import Path
-import sqlite3
-import pandas as pd
+from utils.feedback_store import feedback_stats, rating_histogram
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -13,41 +12,16 @@ st.set_page_config(
     layout="wide",
 )
 
-DB_FILE = Path("datasets/page_5/feedback.db").resolve()
+# --- Feedback Summary ---
+# Read from the trigger-maintained summary rows (O(1)); cached briefly so
+# repeated Home visits don't touch the database at all.
+@st.cache_data(ttl=30, show_spinner=False)
+def load_feedback_summary():
+    avg_rating, review_count = feedback_stats()
+    return avg_rating, review_count, rating_histogram()
 
-# --- Database Functions ---
-def create_connection():
-    return sqlite3.connect(DB_FILE)
-
-def create_feedback_table():
-    conn = create_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            feedback TEXT,
-            rating INTEGER
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def load_feedback():
-    create_feedback_table()
-    conn = create_connection()
-    df = pd.read_sql_query("SELECT name, feedback, rating FROM feedback", conn)
-    conn.close()
-    return df
-
-def calculate_feedback_stats(df):
-    avg_rating = df['rating'].mean() if not df.empty else 0
-    review_count = df.shape[0]
-    return avg_rating, review_count
-
-# --- Load Feedback and Sidebar Display ---
-feedback_df = load_feedback()
-avg_rating, review_count = calculate_feedback_stats(feedback_df)
+avg_rating, review_count, histogram = load_feedback_summary()
+histogram_text = " · ".join(f"{stars}⭐ {count}" for stars, count in sorted(histogram.items(), reverse=True))
 
 st.sidebar.markdown("""
     <style>
@@ -66,6 +40,7 @@ st.sidebar.markdown(f"""
         <h3 style="text-align: center;">📊 Feedback Summary</h3>
         <p style="font-size: 18px;"><strong>⭐ Average Rating:</strong> {avg_rating:.2f}</p>
         <p style="font-size: 18px;"><strong>📝 Total Reviews:</strong> {review_count}</p>
+        <p style="font-size: 14px;">{histogram_text}</p>
         <hr>
         <span style='color: #b58900;'>⬇️ Use the menu above to navigate</span>
     </div>
@@ -1,23 +1,73 @@
+import json
 import streamlit as st
-import pickle
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import xgboost as xgb
+from utils import model_registry
+from utils.feature_schema import SCHEMA_PATH, load_schema, sample_frame
+from utils.prediction import (
+    FEATURE_COLUMNS, NOT_KNOWN, CompiledPredictor, PredictionCache, format_price, load_pipeline, model_version,
+    predict_batch,
+)
+from utils.resources import file_signature
+from utils.training import REPORT_PATH
 
 # Set page configuration
 st.set_page_config(page_title="🏡 Real Estate Price Prediction", layout="wide")
 
-# Cache loading of model and dataframe to avoid repeated reloads
-@st.cache_data
-def load_model_and_data():
-    with open(Path("datasets/page_1/df.pkl"), "rb") as f:
-        df_loaded = pickle.load(f)
-    with open(Path("datasets/page_1/xgbmodel.pkl"), "rb") as f:
-        pipeline_loaded = pickle.load(f)
-    return df_loaded, pipeline_loaded
+# Load the input schema and model once per process; cache_resource shares
+# the objects instead of copying them on every rerun
+@st.cache_resource(max_entries=2)
+def load_feature_schema(version, signature):
+    # Schema stored with the registry version, else the shared schema file
+    # (``signature`` reloads it when the file is rewritten)
+    if version.startswith("registry:"):
+        version_schema = model_registry.load_schema(version.split(":", 1)[1])
+        if version_schema is not None:
+            return version_schema
+    return load_schema()
 
-df, pipeline = load_model_and_data()
+@st.cache_resource(max_entries=2)
+def load_model(version, _schema):
+    # Active registry version if there is one, else the pickled pipeline
+    if version.startswith("registry:"):
+        return model_registry.load_predictor(version.split(":", 1)[1]), None
+    pipeline_loaded = load_pipeline()
+    predictor = CompiledPredictor.from_pipeline(pipeline_loaded)
+    # Fast single-row path; only used if it reproduces pipeline.predict exactly
+    if not predictor.matches(pipeline_loaded, sample_frame(_schema)):
+        predictor = None
+    return predictor, pipeline_loaded
+
+# Switching the registry's CURRENT version (or replacing xgbmodel.pkl)
+# changes this key, which hot-swaps the model on the next rerun
+active_version = model_registry.current_version()
+current_model_version = f"registry:{active_version}" if active_version else f"pickle:{model_version()}"
+schema = load_feature_schema(current_model_version, file_signature(SCHEMA_PATH))
+vocab = schema["vocabularies"]
+predictor, pipeline = load_model(current_model_version, schema)
+
+# Training report (CV metrics) stored with registry versions by utils.training,
+# else the last training report if it was written for the served xgbmodel.pkl
+model_report = model_registry.load_manifest(active_version).get("metadata") if active_version else None
+if not model_report and REPORT_PATH.exists():
+    model_report = json.loads(REPORT_PATH.read_text())
+    if active_version or model_report.get("model_version") != model_version():
+        model_report = None
+model = predictor if predictor is not None else pipeline
+
+# Process-wide prediction cache shared by all sessions
+@st.cache_resource
+def load_prediction_cache():
+    return PredictionCache(maxsize=4096, ttl=3600)
+
+prediction_cache = load_prediction_cache()
+
+def predict_price(features):
+    # (price, P10/P50/P90 bands or None); bands reuse the same feature row
+    if predictor is not None:
+        return predictor.predict_with_bands(features)
+    return float(np.exp(pipeline.predict(pd.DataFrame([features], columns=FEATURE_COLUMNS)))[0]), None
 
 # Initialize session state for download dataframe
 if 'download_df' not in st.session_state:
@@ -75,13 +125,23 @@ with col2:
 # ---------- Sidebar ----------
 with st.sidebar:
     st.header("📊 Model Details")
-    st.markdown("""
+    if model_report:
+        st.markdown(f"""
+    - **Accuracy:** {model_report['cv']['r2']['mean'] * 100:.2f}% (R² Score, {model_report['folds']}-fold CV)  
+    - **MAE:** {model_report['cv']['mae_log']['mean']:.2f}  
+    - **Source:** [99acres.com](https://www.99acres.com)
+    """)
+    else:
+        st.markdown("""
     - **Accuracy:** 93.57% (R² Score)  
     - **MAE:** 0.17  
     - **Source:** [99acres.com](https://www.99acres.com)
     """)
     st.markdown("---")
     st.info("ℹ️ Navigate using the page menu if hidden.")
+    st.caption(f"🧠 Model version: {current_model_version}")
+    # Filled in at the end of the script so it includes this run's prediction
+    cache_stats_placeholder = st.empty()
 
 # ---------- Guidelines ----------
 with st.expander("📋 Guidelines"):
@@ -97,24 +157,26 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("📍 Location & Size")
-    location = st.selectbox("Location", sorted(df['location'].unique()))
-    built_up_area = st.number_input("Built-up Area (sq. ft)", min_value=200, step=50, value=1000)
+    location = st.selectbox("Location", vocab['location'])
+    built_up_area = st.number_input("Built-up Area (sq. ft)", min_value=200, step=50, value=schema["defaults"]["built_up_area"])
 
     st.subheader("🏢 Property Details")
-    bedrooms = int(st.selectbox("Bedrooms", sorted(df['bedrooms'].unique())))
-    bathrooms = int(st.selectbox("Bathrooms", sorted(df['bathrooms'].unique())))
-    balconies = int(st.selectbox("Balconies", sorted(df['balconies'].unique())))
-    age_of_property = st.selectbox("Age of Property", sorted(df['age_of_property'].unique()))
+    bedrooms = int(st.selectbox("Bedrooms", vocab['bedrooms']))
+    bathrooms = int(st.selectbox("Bathrooms", vocab['bathrooms']))
+    # Labels ('1 balcony') for the pickled model, counts for retrained versions;
+    # the schema matches the served model, so pass the value through as-is
+    balconies = st.selectbox("Balconies", vocab['balconies'])
+    age_of_property = st.selectbox("Age of Property", vocab['age_of_property'])
 
 with col2:
     st.subheader("🔧 Amenities & Features")
     storage_room = int(st.selectbox("Servant Room (0-No, 1-Yes)", [0, 1]))
     pooja_room = int(st.selectbox("Pooja Room (0-No, 1-Yes)", [0, 1]))
-    furnishing_status = st.selectbox("Furnishing", ['Not Known'] + sorted(df['furnishing_status'].unique()))
-    parking_space = st.selectbox("Parking Type", ['Not Known'] + sorted(df['parking_space'].unique()))
-    flooring_type = st.selectbox("Flooring Type", ['Not Known'] + sorted(df['flooring_type'].unique()))
-    luxury_category = st.selectbox("Luxury Category", sorted(df['luxury_category'].unique()))
-    floor_category = st.selectbox("Floor Category", sorted(df['floor_category'].unique()))
+    furnishing_status = st.selectbox("Furnishing", [NOT_KNOWN] + vocab['furnishing_status'])
+    parking_space = st.selectbox("Parking Type", [NOT_KNOWN] + vocab['parking_space'])
+    flooring_type = st.selectbox("Flooring Type", [NOT_KNOWN] + vocab['flooring_type'])
+    luxury_category = st.selectbox("Luxury Category", vocab['luxury_category'])
+    floor_category = st.selectbox("Floor Category", vocab['floor_category'])
 
 # ---------- Prediction Section ----------
 st.markdown("### Prediction")
@@ -128,26 +190,20 @@ with col_pred:
             flooring_type, parking_space, built_up_area, storage_room, pooja_room,
             location, floor_category, luxury_category
         ]]
-        cols = [
-            'bedrooms', 'bathrooms', 'balconies', 'age_of_property', 'furnishing_status',
-            'flooring_type', 'parking_space', 'built_up_area', 'storage_room',
-            'pooja_room', 'location', 'floor_category', 'luxury_category'
-        ]
-
-        df_input = pd.DataFrame(data, columns=cols)
-
-        # Predict using the loaded pipeline
-        price = np.exp(pipeline.predict(df_input))[0]
-
-        # Price formatting
-        if price < 1:
-            price_text = f"₹ {round(price * 100, 2)} Lakhs"
-        else:
-            price_text = f"₹ {round(price, 2)} Crores"
+        # Predict (cached per input and model version)
+        features = dict(zip(FEATURE_COLUMNS, data[0]))
+        price, bands = prediction_cache.get_or_compute(features, current_model_version, predict_price)
+        df_input = pd.DataFrame(data, columns=FEATURE_COLUMNS)
+        price_text = format_price(price)
 
         st.success(f"💰 **Estimated Price:** {price_text}")
+        if bands:
+            st.info(f"📉 **Likely Range:** {format_price(bands['P10'])} – {format_price(bands['P90'])} (P10–P90)")
 
         # Add predicted price to dataframe for display and download
+        if bands:
+            for band in reversed(list(bands)):
+                df_input.insert(0, f"{band} Price", format_price(bands[band]))
         df_input.insert(0, "Predicted Price", price_text)
         st.dataframe(df_input)
 
@@ -168,3 +224,34 @@ if st.session_state['download_df'] is not None:
         file_name="predicted_price.csv",
         mime='text/csv'
     )
+
+# ---------- Batch Prediction ----------
+st.markdown("---")
+st.markdown("## 📂 Batch Prediction")
+st.markdown(f"Upload a CSV with the columns: `{', '.join(FEATURE_COLUMNS)}`")
+
+uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
+if uploaded_file is not None:
+    try:
+        batch_results, batch_errors = predict_batch(model, pd.read_csv(uploaded_file))
+    except ValueError as e:
+        st.error(f"❌ {e}")
+    else:
+        if batch_errors:
+            with st.expander(f"⚠️ {len(batch_errors)} rows skipped"):
+                st.write("\n".join(f"- {error}" for error in batch_errors))
+        st.success(f"💰 Predicted prices for {len(batch_results)} properties.")
+        st.dataframe(batch_results.head(1000))
+        st.download_button(
+            label="📥 Download Batch Predictions",
+            data=batch_results.to_csv(index=False).encode('utf-8'),
+            file_name="batch_predicted_prices.csv",
+            mime='text/csv'
+        )
+
+# ---------- Cache Stats ----------
+cache_stats = prediction_cache.stats()
+cache_stats_placeholder.caption(
+    f"⚡ Prediction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+    f"({cache_stats['hit_rate']:.0%} hit rate)"
+)
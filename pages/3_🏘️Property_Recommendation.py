@@ -1,25 +1,16 @@
 import streamlit as st
 import pandas as pd
-from PIL import Image
-from pathlib import Path
+from utils.recommender import DEFAULT_WEIGHTS, recommend
+from utils.resources import load_image, load_metrics, load_recommendation_data
+from utils.search import search_listings
 
-# Load data
-path_1 = Path('datasets/page_2/Recomendation_system_final_data.xls')
-joined_df = pd.read_csv(path_1)
-
-path_2 = Path('datasets/page_2/cosine_sim_by_near_by_locations.pkl')
-cosine_sim_by_near_by_locations = pd.read_pickle(path_2)
-
-path_3 = Path('datasets/page_2/cosine_sim_facility_based.pkl')
-cosine_sim_facility_based = pd.read_pickle(path_3)
-
-path_4 = Path('datasets/page_2/cosine_sim_property_inof_based.pkl')
-cosine_sim_property_inof_based = pd.read_pickle(path_4)
+# Load data (shared read-only by all sessions of this process)
+joined_df, similarity_indexes, feature_vectors, society_rows = load_recommendation_data()
 
 # Prepare property list and image
-unique_properties = joined_df['society_name'].unique()
-image_path = Path("datasets/page_2/img.jpg")
-image = Image.open(image_path)
+# Societies in the lookup index (listings without a name are left out)
+unique_properties = list(society_rows)
+image = load_image("datasets/page_2/img.jpg", size=(750, 400))
 
 # Custom CSS Styling
 st.markdown("""
@@ -68,6 +59,9 @@ st.sidebar.markdown("""
 - **Verification:** Cross-check details below for accuracy.
 """)
 
+with st.sidebar.expander("⏱️ Data Load Metrics"):
+    st.dataframe(load_metrics(), use_container_width=True)
+
 # Header
 st.markdown("""
     <style>
@@ -86,7 +80,7 @@ st.markdown("""
         🏠 <span class="gradient-text">Property Recommendation System</span>
     </h1>
 """, unsafe_allow_html=True)
-st.image(image.resize((750, 400)))
+st.image(image)
 
 # Guidelines
 st.markdown("### 📌 How to Use")
@@ -96,14 +90,29 @@ st.markdown("""
    - **Nearby Locations** – Based on geography.
    - **Facility Based** – Amenities and features.
    - **Property Info Based** – Price, size, etc.
-   - **Combined** – Uses all above factors.
+   - **Combined** – Uses all above factors, with adjustable weights.
 3. Click **Recommend** to get results.
 4. See detailed data of the results below.
 """)
 
 # Inputs
 unique_properties_title_case = [prop.title() for prop in unique_properties]
-property_name = st.selectbox("🏠 Select Society Name", unique_properties_title_case, index=1)
+default_index = 1
+
+# Full-text search narrows the society list to the best matches
+search_text = st.text_input("🔎 Search listings", placeholder="e.g. swimming pool hinjewadi")
+if search_text.strip():
+    match_rows, _ = search_listings(search_text, limit=50)
+    if len(match_rows):
+        matches = joined_df.iloc[match_rows]
+        st.dataframe(matches[['society_name', 'property_name', 'place', 'price', 'bedrooms', 'link']],
+                     use_container_width=True, hide_index=True)
+        unique_properties_title_case = [prop.title() for prop in matches['society_name'].dropna().unique()]
+        default_index = 0
+    else:
+        st.warning("No listings match your search; showing all societies.")
+
+property_name = st.selectbox("🏠 Select Society Name", unique_properties_title_case, index=default_index)
 
 option_display = {
     "nearby_locations": "Nearby Locations",
@@ -114,37 +123,37 @@ option_display = {
 option_choice = st.selectbox("📊 Recommendation Type", list(option_display.values()), index=0)
 option = [key for key, value in option_display.items() if value == option_choice][0]
 
-# Recommendation Function
-def recommend_properties(property_name, option, n=5):
-    idx = joined_df.index[joined_df['society_name'] == property_name.lower()].tolist()[0]
+weights = None
+if option == "auto":
+    st.markdown("#### ⚖️ Combined Weights")
+    weight_cols = st.columns(len(DEFAULT_WEIGHTS))
+    weights = {
+        name: col.slider(option_display[name], 0.0, 2.0, default, step=0.1)
+        for col, (name, default) in zip(weight_cols, DEFAULT_WEIGHTS.items())
+    }
 
-    if option == "nearby_locations":
-        cosine_sim_matrix = cosine_sim_by_near_by_locations
-    elif option == "facility_based":
-        cosine_sim_matrix = cosine_sim_facility_based
-    elif option == "property_info_based":
-        cosine_sim_matrix = cosine_sim_property_inof_based
-    else:
-        cosine_sim_matrix = (
-            0.8 * cosine_sim_property_inof_based +
-            0.6 * cosine_sim_facility_based +
-            1.0 * cosine_sim_by_near_by_locations
-        )
+aggregate = None
+if len(society_rows[property_name.lower()]) > 1:
+    if st.checkbox(f"🏘️ Use all {len(society_rows[property_name.lower()])} listings of this society"):
+        aggregate = "max"
 
-    sim_scores = list(enumerate(cosine_sim_matrix[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[1:n+1]
-    property_indices = [i[0] for i in sim_scores]
+# Recommendation Function
+def recommend_properties(property_name, option, n=5, weights=None, aggregate=None):
+    property_indices, scores = recommend(
+        similarity_indexes, feature_vectors, society_rows, property_name, option, n, weights, aggregate
+    )
 
+    property_indices = property_indices.tolist()
     recommendations_df = pd.DataFrame({
         '🏢 Property': joined_df['society_name'].iloc[property_indices],
-        '🔗 Similarity (%)': [round(score[1]*100, 2) for score in sim_scores]
+        '🔗 Similarity (%)': [round(float(score) * 100, 2) for score in scores]
     })
 
     return recommendations_df, property_indices
 
 # Recommend Button
 if st.button("🔍 Recommend"):
-    recommendations, indices = recommend_properties(property_name, option)
+    recommendations, indices = recommend_properties(property_name, option, weights=weights, aggregate=aggregate)
     st.success("Here are the top recommendations:")
     st.dataframe(recommendations, use_container_width=True)
 
@@ -1,10 +1,9 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import pickle
-from PIL import Image
-from pathlib import Path
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
+from utils.analytics import COLUMN_DISPLAY_NAMES, SCATTER_MAX_POINTS, density_grid, downsample_by_density
+from utils.geo import GRID_RESOLUTIONS, METRICS, aggregate_cells, in_viewport
+from utils.resources import analytics_signature, load_analytics_data, load_image
 
 st.set_page_config(page_title="Pune Real Estate Analytics", layout="wide")
 
@@ -55,9 +54,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Header Image
-image_path = "datasets/page_3/data_analysis_image.jpg"
-image = Image.open(image_path).resize((1000, 500))
-st.image(image)
+st.image(load_image("datasets/page_3/data_analysis_image.jpg", size=(1000, 500)))
 
 # Intro
 st.markdown("""
@@ -65,150 +62,223 @@ Welcome to the **Pune Real Estate Analytics Dashboard**!
 Explore real estate trends, prices, and visual insights from Pune using interactive charts and maps.
 """)
 
-# Load data
-feature_path = Path('datasets/page_3/feature_text.pkl')
-feature_text = pickle.load(open(feature_path, 'rb'))
+# Load data (cached per process)
+new_df, geo_listings, price_aggregates = load_analytics_data()
+data_version = analytics_signature()
+column_display_names = COLUMN_DISPLAY_NAMES
 
-group_df_median = pd.read_csv('datasets/page_3/median_agg_map_df.xls')
-group_df_mean = pd.read_csv('datasets/page_3/avg_agg_map_df.xls')
-new_df = pd.read_csv('datasets/page_3/analystics_module_data.xls')
+# Widget-driven sections run as fragments so changing one input reruns only
+# that chart; st.fragment is st.experimental_fragment on older Streamlit.
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
 
-group_df_median.columns = ['Location', 'Price', 'Price Per Sq.Ft.', 'Built Up Area', 'Latitude', 'Longitude']
-group_df_mean.columns = ['Location', 'Price', 'Price Per Sq.Ft.', 'Built Up Area', 'Latitude', 'Longitude']
 
-# Section: Map
-st.markdown("---")
-st.header("📍 Location Price per Sqft Geomap")
-agg_method = st.radio("Choose the aggregation method:", ('Mean', 'Median'))
-
-df_to_use = group_df_mean if agg_method == 'Mean' else group_df_median
-fig_map = px.scatter_mapbox(
-    df_to_use,
-    lat="Latitude",
-    lon="Longitude",
-    color="Price Per Sq.Ft.",
-    size='Built Up Area',
-    color_continuous_scale=px.colors.cyclical.IceFire,
-    zoom=9.7,
-    mapbox_style="open-street-map",
-    hover_name='Location',
-    hover_data={'Price': True},
-    width=1600,
-    height=550
-)
-
-fig_map.update_traces(hovertemplate="""
+# --- Cached figures ---
+# Each builder is keyed on the data version plus the widget inputs it depends
+# on, so a rerun with the same inputs reuses the figure instead of rebuilding it.
+
+# Keyed on the viewport too, so only the most recent views are kept
+@st.cache_resource(show_spinner=False, max_entries=32)
+def map_figure(version, resolution, metric, lat_range, lon_range):
+    cells = aggregate_cells(geo_listings, GRID_RESOLUTIONS[resolution], METRICS[metric])
+    # Only cells inside the viewport are sent to the browser
+    df_to_use = in_viewport(cells, lat_range, lon_range)
+    fig_map = px.scatter_mapbox(
+        df_to_use,
+        lat="Latitude",
+        lon="Longitude",
+        color="Price Per Sq.Ft.",
+        size='Built Up Area',
+        color_continuous_scale=px.colors.cyclical.IceFire,
+        zoom=9.7,
+        mapbox_style="open-street-map",
+        hover_name='Location',
+        hover_data={'Price': True, 'Listings': True},
+        width=1600,
+        height=550
+    )
+
+    fig_map.update_traces(hovertemplate="""
 <b>Location:</b> %{hovertext}<br>
 <b>Price per Sq.Ft.:</b> ₹%{marker.color:.2f}<br>
 <b>Built Up Area:</b> %{marker.size:,.2f} sq.ft.<br>
-<b>Price:</b> ₹%{customdata[0]:,.2f} Crore<br><extra></extra>
+<b>Price:</b> ₹%{customdata[0]:,.2f} Crore<br>
+<b>Listings:</b> %{customdata[1]}<br><extra></extra>
 """)
+    return fig_map
 
-st.plotly_chart(fig_map, use_container_width=True)
 
-# Section: Area vs Price
-st.markdown("---")
-st.header("📏 Area vs Price")
+# Keyed on the zoom window too, so only the most recent views are kept
+@st.cache_resource(show_spinner=False, max_entries=32)
+def area_price_figure(version, mode, area_range, price_range):
+    view = new_df[new_df['built_up_area'].between(*area_range) & new_df['price'].between(*price_range)]
 
-fig_area_price = px.scatter(
-    new_df, x="built_up_area", y="price", color="bedrooms", title="Built-Up Area vs Price"
-)
-fig_area_price.update_layout(width=900, height=600)
-fig_area_price.update_traces(hovertemplate="""
+    # The payload is bounded either way: a DENSITY_BINS x DENSITY_BINS grid of
+    # counts binned here, or at most ~SCATTER_MAX_POINTS WebGL markers sampled
+    # to preserve the density.
+    if mode == 'Density':
+        counts, area_centers, price_centers = density_grid(view, "built_up_area", "price")
+        fig_area_price = go.Figure(go.Heatmap(
+            x=area_centers, y=price_centers, z=counts, colorscale="Viridis", colorbar=dict(title="Listings"),
+            hovertemplate="""
+<b>Built-up Area:</b> %{x:,.0f} sq.ft.<br>
+<b>Price:</b> ₹%{y:.2f} Crore<br>
+<b>Listings:</b> %{z}<br><extra></extra>
+"""
+        ))
+        fig_area_price.update_layout(
+            title="Built-Up Area vs Price (listing density)",
+            xaxis_title="Built-up Area", yaxis_title="Price"
+        )
+    else:
+        points = downsample_by_density(view, "built_up_area", "price")
+        title = "Built-Up Area vs Price"
+        if len(points) < len(view):
+            title += f" ({len(points):,} of {len(view):,} listings shown)"
+        fig_area_price = px.scatter(
+            points, x="built_up_area", y="price", color="bedrooms", title=title, render_mode="webgl"
+        )
+        fig_area_price.update_traces(hovertemplate="""
 <b>Built-up Area:</b> %{x} sq.ft.<br>
 <b>Price:</b> ₹%{y:.2f} Crore<br>
 <b>Bedrooms:</b> %{marker.color}<br><extra></extra>
 """)
-fig_area_price.update_yaxes(tickprefix="₹", tickformat=",.2f", ticksuffix=" Crore")
-st.plotly_chart(fig_area_price)
+    fig_area_price.update_layout(width=900, height=600)
+    fig_area_price.update_yaxes(tickprefix="₹", tickformat=",.2f", ticksuffix=" Crore")
+    return fig_area_price
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def bhk_pie_figure(version, selected_location):
+    if selected_location == 'overall':
+        fig_pie = px.pie(price_aggregates.table('bedrooms'), names='bedrooms', values='count',
+                         title='Overall Bedroom Distribution',
+                         color_discrete_sequence=px.colors.qualitative.Pastel)
+    else:
+        location_bhk = price_aggregates.table(('location', 'bedrooms'))
+        fig_pie = px.pie(location_bhk[location_bhk['location'] == selected_location],
+                         names='bedrooms', values='count',
+                         title=f'Bedroom Distribution in {selected_location}',
+                         color_discrete_sequence=px.colors.qualitative.Pastel)
+
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    return fig_pie
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def bhk_box_figure(version):
+    fig_box = px.box(
+        new_df[new_df['bedrooms'] <= 4],
+        x='bedrooms',
+        y='price',
+        title='BHK Price Range'
+    )
+    fig_box.update_layout(
+        font=dict(family="Arial", size=14, color="white"),
+        paper_bgcolor='rgba(0, 0, 0, 0.8)',
+        plot_bgcolor='rgba(0, 0, 0, 0.8)',
+        title_font=dict(size=20, color='white')
+    )
+    fig_box.update_traces(
+        hovertemplate="<b>Bedrooms:</b> %{x}<br><b>Price:</b> ₹%{y:.2f} Crore<extra></extra>",
+        marker=dict(color='rgba(0, 123, 255, 0.6)', line=dict(color='rgba(0, 123, 255, 1.0)', width=1))
+    )
+    return fig_box
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def feature_bar_figure(version, selected_column, calculation_type):
+    selected_option = column_display_names[selected_column]
+    stat = 'mean' if calculation_type == 'Mean' else 'median'
+    agg_df = price_aggregates.table(selected_column)[[selected_column, stat]].rename(columns={stat: 'price'})
+
+    fig_bar = px.bar(
+        agg_df,
+        x=selected_column,
+        y='price',
+        title=f"{calculation_type} Price by {selected_option}",
+        labels={'price': f'{calculation_type} Price', selected_column: selected_option}
+    )
+    fig_bar.update_layout(
+        font=dict(family="Arial", size=14, color="white"),
+        paper_bgcolor='rgba(0, 0, 0, 0.8)',
+        plot_bgcolor='rgba(0, 0, 0, 0.8)',
+        title_font=dict(size=20, color='white'),
+    )
+    fig_bar.update_traces(
+        hovertemplate=f"<b>{selected_option}:</b> %{{x}}<br><b>Price:</b> ₹%{{y:.2f}} Crore<br><extra></extra>"
+    )
+    return fig_bar
+
+
+# Section: Map
+st.markdown("---")
+st.header("📍 Location Price per Sqft Geomap")
+
+lat_bounds = (round(float(geo_listings['latitude'].min()) - 0.01, 2), round(float(geo_listings['latitude'].max()) + 0.01, 2))
+lon_bounds = (round(float(geo_listings['longitude'].min()) - 0.01, 2), round(float(geo_listings['longitude'].max()) + 0.01, 2))
+
+@fragment
+def map_section():
+    metric_col, resolution_col = st.columns(2)
+    metric = metric_col.radio("Choose the aggregation method:", list(METRICS), horizontal=True)
+    resolution = resolution_col.radio("Group listings by:", list(GRID_RESOLUTIONS), horizontal=True)
+    with st.expander("Map viewport"):
+        lat_range = st.slider("Latitude", *lat_bounds, lat_bounds, step=0.01)
+        lon_range = st.slider("Longitude", *lon_bounds, lon_bounds, step=0.01)
+    st.plotly_chart(map_figure(data_version, resolution, metric, lat_range, lon_range), use_container_width=True)
+
+map_section()
+
+# Section: Area vs Price
+st.markdown("---")
+st.header("📏 Area vs Price")
+
+area_bounds = (float(new_df['built_up_area'].min()), float(new_df['built_up_area'].max()))
+price_bounds = (float(new_df['price'].min()), float(new_df['price'].max()))
+
+@fragment
+def area_price_section():
+    default_mode = 'Points' if len(new_df) <= SCATTER_MAX_POINTS else 'Density'
+    mode = st.radio("Rendering", ('Points', 'Density'), index=('Points', 'Density').index(default_mode),
+                    horizontal=True, key="area_price_mode")
+    # Narrowing the ranges zooms in: the sampling budget is spent on the
+    # visible window, so more of its listings are drawn
+    area_col, price_col = st.columns(2)
+    area_range = area_col.slider("Built-up Area (sq.ft.)", *area_bounds, area_bounds, step=50.0)
+    price_range = price_col.slider("Price (Crore)", *price_bounds, price_bounds, step=0.05)
+    st.plotly_chart(area_price_figure(data_version, mode, area_range, price_range))
+
+area_price_section()
 
 # Section: BHK Pie
 st.markdown("---")
 st.header("🏠 BHK Pie Chart")
 
-location_options = new_df['location'].unique().tolist()
-location_options.insert(0, 'overall')
-selected_location = st.selectbox('Select Location', location_options)
+location_options = ['overall'] + new_df['location'].unique().tolist()
 
-if selected_location == 'overall':
-    fig_pie = px.pie(new_df, names='bedrooms', title='Overall Bedroom Distribution',
-                     color_discrete_sequence=px.colors.qualitative.Pastel)
-else:
-    fig_pie = px.pie(new_df[new_df['location'] == selected_location],
-                     names='bedrooms',
-                     title=f'Bedroom Distribution in {selected_location}',
-                     color_discrete_sequence=px.colors.qualitative.Pastel)
+@fragment
+def bhk_pie_section():
+    selected_location = st.selectbox('Select Location', location_options)
+    st.plotly_chart(bhk_pie_figure(data_version, selected_location))
 
-fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-st.plotly_chart(fig_pie)
+bhk_pie_section()
 
 # Section: Box Plot
 st.markdown("---")
 st.header("🏢 Side-by-Side BHK Price Comparison")
-
-fig_box = px.box(
-    new_df[new_df['bedrooms'] <= 4],
-    x='bedrooms',
-    y='price',
-    title='BHK Price Range'
-)
-fig_box.update_layout(
-    font=dict(family="Arial", size=14, color="white"),
-    paper_bgcolor='rgba(0, 0, 0, 0.8)',
-    plot_bgcolor='rgba(0, 0, 0, 0.8)',
-    title_font=dict(size=20, color='white')
-)
-fig_box.update_traces(
-    hovertemplate="<b>Bedrooms:</b> %{x}<br><b>Price:</b> ₹%{y:.2f} Crore<extra></extra>",
-    marker=dict(color='rgba(0, 123, 255, 0.6)', line=dict(color='rgba(0, 123, 255, 1.0)', width=1))
-)
-st.plotly_chart(fig_box)
+st.plotly_chart(bhk_box_figure(data_version))
 
 # Section: Feature-wise Bar Chart
 st.markdown("---")
 st.header("📊 Feature-wise Price Comparison")
 
-column_display_names = {
-    'bedrooms': 'Bedrooms',
-    'bathrooms': 'Bathrooms',
-    'balconies': 'Balconies',
-    'facing': 'Facing',
-    'age_of_property': 'Age of Property',
-    'furnishing_status': 'Furnishing Status',
-    'flooring_type': 'Flooring Type',
-    'parking_space': 'Parking Space',
-    'study_room': 'Study Room',
-    'servant_room': 'Servant Room',
-    'storage_room': 'Storage Room',
-    'pooja_room': 'Pooja Room',
-    'others': 'Others',
-    'location': 'Location',
-    'floor_category': 'Floor Category',
-    'luxury_category': 'Luxury Category'
-}
+@fragment
+def feature_bar_section():
+    selected_option = st.selectbox("Select a feature", list(column_display_names.values()))
+    selected_column = [key for key, value in column_display_names.items() if value == selected_option][0]
+    calculation_type = st.radio("Select calculation type", ['Mean', 'Median'])
+    st.plotly_chart(feature_bar_figure(data_version, selected_column, calculation_type))
 
-selected_option = st.selectbox("Select a feature", list(column_display_names.values()))
-selected_column = [key for key, value in column_display_names.items() if value == selected_option][0]
-calculation_type = st.radio("Select calculation type", ['Mean', 'Median'])
-
-agg_df = new_df.groupby(selected_column)['price'].mean().reset_index() if calculation_type == 'Mean' else new_df.groupby(selected_column)['price'].median().reset_index()
-
-fig_bar = px.bar(
-    agg_df,
-    x=selected_column,
-    y='price',
-    title=f"{calculation_type} Price by {selected_option}",
-    labels={'price': f'{calculation_type} Price', selected_column: selected_option}
-)
-fig_bar.update_layout(
-    font=dict(family="Arial", size=14, color="white"),
-    paper_bgcolor='rgba(0, 0, 0, 0.8)',
-    plot_bgcolor='rgba(0, 0, 0, 0.8)',
-    title_font=dict(size=20, color='white'),
-)
-fig_bar.update_traces(
-    hovertemplate=f"<b>{selected_option}:</b> %{{x}}<br><b>Price:</b> ₹%{{y:.2f}} Crore<br><extra></extra>"
-)
-st.plotly_chart(fig_bar)
+feature_bar_section()
 
 st.markdown("---")
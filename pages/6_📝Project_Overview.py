@@ -1,37 +1,8 @@
+import queue
 import streamlit as st
-import pandas as pd
-import sqlite3
-from pathlib import Path
+from utils.feedback_store import feedback_page, get_writer
 
-DB_FILE = Path("datasets/page_5/feedback.db").resolve()
-
-# --- Database Functions ---
-def create_connection():
-    return sqlite3.connect(DB_FILE)
-
-def create_feedback_table():
-    conn = create_connection()
-    conn.execute('''CREATE TABLE IF NOT EXISTS feedback 
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                     name TEXT, 
-                     feedback TEXT, 
-                     rating REAL)''')
-    conn.commit()
-    conn.close()
-
-def load_feedback():
-    create_feedback_table()
-    conn = create_connection()
-    df = pd.read_sql("SELECT name, feedback, rating FROM feedback", conn)
-    conn.close()
-    return df
-
-def save_feedback(name, feedback, rating):
-    create_feedback_table()
-    conn = create_connection()
-    conn.execute("INSERT INTO feedback (name, feedback, rating) VALUES (?, ?, ?)", (name, feedback, rating))
-    conn.commit()
-    conn.close()
+LATEST_FEEDBACK_COUNT = 20
 
 def check_feedback_submitted():
     if "feedback_submitted" not in st.session_state:
@@ -88,19 +59,26 @@ def main():
 
             if submit:
                 if name.strip() and feedback.strip():
-                    save_feedback(name.strip(), feedback.strip(), rating)
-                    st.success("✅ Thank you for your feedback!")
-                    st.session_state.feedback_submitted = True
+                    # Queued for the background writer; returns without waiting on the database
+                    try:
+                        get_writer().submit(name.strip(), feedback.strip(), rating)
+                    except queue.Full:
+                        st.warning("⏳ We're receiving a lot of feedback right now. Please submit again in a moment.")
+                    else:
+                        st.success("✅ Thank you for your feedback!")
+                        st.session_state.feedback_submitted = True
                 else:
                     st.warning("⚠️ Please provide both name and feedback.")
 
     else:
         st.success("✅ Feedback already submitted. Thanks!")
 
-    # --- View All Feedback (optional) ---
-    with st.expander("📬 View All Feedback"):
-        df = load_feedback()
+    # --- Latest Feedback (optional) ---
+    # Expander bodies run on every rerun, so read one keyset page, not the whole table
+    with st.expander("📬 View Latest Feedback"):
+        df = feedback_page(limit=LATEST_FEEDBACK_COUNT)
         st.dataframe(df)
+        st.caption("Browse, filter and search all feedback on the Feedback page.")
 
 if __name__ == "__main__":
     main()
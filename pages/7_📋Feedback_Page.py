@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
+from html import escape
 from pathlib import Path
 import yaml
+from utils.feedback_store import delete_feedback, feedback_page, feedback_stats
+from utils.resources import invalidate
+from utils.search import search_feedback
 
 # Load configuration
 path_ = Path("datasets/page_3/config.yaml")
@@ -10,32 +12,27 @@ with open(path_, "r") as f:
     config = yaml.safe_load(f)
 HOST_PASSWORD = config.get("HOST_PASSWORD")
 
-DB_FILE = Path("datasets/page_5/feedback.db").resolve()
+PAGE_SIZE = 20
 
-def create_connection():
-    return sqlite3.connect(DB_FILE)
+# --- Pagination ---
+# Keyset pagination: session state keeps the ``before_id`` cursor of every
+# page visited so far, so Previous/Next are single indexed queries.
+def reset_pages():
+    st.session_state.wall_cursors = [None]
 
-def create_feedback_table():
-    conn = create_connection()
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS feedback 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, feedback TEXT, rating INTEGER)''')
-    conn.commit()
-    conn.close()
-
-def load_feedback():
-    create_feedback_table()
-    conn = create_connection()
-    df = pd.read_sql_query("SELECT id, name, feedback, rating FROM feedback", conn)
-    conn.close()
-    return df
-
-def delete_feedback(feedback_id):
-    conn = create_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM feedback WHERE id=?", (feedback_id,))
-    conn.commit()
-    conn.close()
+def render_feedback(page_df):
+    """All entries of a page as one HTML block (user text is escaped)."""
+    boxes = []
+    for row in page_df.itertuples(index=False):
+        posted = f" · 🕒 {escape(row.created_at[:10])}" if isinstance(row.created_at, str) else ""
+        boxes.append(f"""
+            <div class='feedback-box'>
+                <div class='name'>👤 {escape(str(row.name))}</div>
+                <div class='rating'>⭐ Rating: {row.rating:g}{posted}</div>
+                <div class='comment'>💬 {escape(str(row.feedback))}</div>
+            </div>
+        """)
+    st.markdown("".join(boxes), unsafe_allow_html=True)
 
 def main():
     # Dark theme compatible styles
@@ -84,32 +81,71 @@ def main():
 
     st.markdown("<div class='section-title'>📋 Feedback Wall</div>", unsafe_allow_html=True)
     
-    feedback_df = load_feedback()
-    if feedback_df.empty:
+    _, review_count = feedback_stats()
+    if review_count == 0:
         st.warning("No feedback available yet. Be the first to give your thoughts! 😊")
     else:
-        st.info(f"Showing {len(feedback_df)} feedback entries")
-
         st.sidebar.header("🔐 Admin Login")
         password = st.sidebar.text_input("Enter password", type="password")
         is_host = password == HOST_PASSWORD
 
         if password and not is_host:
             st.sidebar.error("Access Denied")
+        if is_host and st.sidebar.button("♻️ Reload data files"):
+            # Clears this server process's cached datasets, indexes and images
+            invalidate()
+            st.sidebar.success("Data files will be reloaded on the next page view.")
+
+        search_text = st.text_input("🔎 Search feedback", placeholder="Search names and comments",
+                                    on_change=reset_pages)
+        if search_text.strip():
+            # Ranked full-text matches instead of the paginated wall
+            page_df = search_feedback(search_text, limit=PAGE_SIZE)
+            st.info(f"Top {len(page_df)} matches out of {review_count} feedback entries")
+            if page_df.empty:
+                st.warning("No feedback matches your search.")
+            else:
+                render_feedback(page_df)
+        else:
+            # Filters; feedback_page picks the index that serves them
+            if "wall_cursors" not in st.session_state:
+                reset_pages()
+            rating_col, date_col = st.columns(2)
+            min_rating = rating_col.slider("Minimum rating", 0.0, 5.0, 0.0, step=0.5, on_change=reset_pages)
+            since = date_col.date_input("Submitted since", value=None, on_change=reset_pages)
 
-        for _, row in feedback_df.iterrows():
-            st.markdown(f"""
-                <div class='feedback-box'>
-                    <div class='name'>👤 {row['name']}</div>
-                    <div class='rating'>⭐ Rating: {row['rating']}</div>
-                    <div class='comment'>💬 {row['feedback']}</div>
-                </div>
-            """, unsafe_allow_html=True)
+            cursors = st.session_state.wall_cursors
+            page_df = feedback_page(
+                cursors[-1], PAGE_SIZE + 1, min_rating, since.isoformat() if since else None
+            )
+            # One extra row tells whether there is a next page
+            has_next = len(page_df) > PAGE_SIZE
+            page_df = page_df.head(PAGE_SIZE)
 
-            if is_host:
-                if st.button("🗑️ Delete", key=f"delete_{row['id']}"):
-                    delete_feedback(row['id'])
-                    st.experimental_rerun()
+            st.info(f"{review_count} feedback entries · page {len(cursors)}")
+            if page_df.empty:
+                st.warning("No feedback matches these filters.")
+            else:
+                render_feedback(page_df)
+
+            prev_col, _, next_col = st.columns([1, 4, 1])
+            if prev_col.button("⬅️ Previous", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if next_col.button("Next ➡️", disabled=not has_next):
+                cursors.append(int(page_df['id'].iloc[-1]))
+                st.rerun()
+
+        if is_host and not page_df.empty:
+            labels = {
+                int(row.id): f"#{row.id} · {row.name} · {str(row.feedback)[:40]}"
+                for row in page_df.itertuples(index=False)
+            }
+            selected = st.multiselect("Select feedback to delete", list(labels), format_func=labels.get)
+            if st.button("🗑️ Delete selected", disabled=not selected):
+                delete_feedback(selected)
+                reset_pages()
+                st.rerun()
 
     st.markdown("""
         <div class='thank-you'>
@@ -0,0 +1,138 @@
+"""Precomputed price aggregates for the Analysis dashboard.
+
+``PriceAggregates`` groups the listings once by every requested key (a
+column name or a tuple of columns) and keeps count / mean / median /
+quartiles of price per group, so charts read a small table instead of
+re-grouping the full dataset on each widget change.
+
+Each group's prices are kept sorted, so appending new listings only
+recomputes the groups they fall into.
+
+``downsample_by_density`` bounds the number of points sent to the browser by
+scatter plots while keeping the shape of the distribution; ``density_grid``
+bins them on the server instead, so a density map is ``bins`` x ``bins``
+counts whatever the row count.
+"""
+import numpy as np
+import pandas as pd
+
+STAT_COLUMNS = ["count", "mean", "median", "p25", "p75"]
+
+# Columns offered in the feature-wise price comparison, with their labels
+COLUMN_DISPLAY_NAMES = {
+    'bedrooms': 'Bedrooms',
+    'bathrooms': 'Bathrooms',
+    'balconies': 'Balconies',
+    'facing': 'Facing',
+    'age_of_property': 'Age of Property',
+    'furnishing_status': 'Furnishing Status',
+    'flooring_type': 'Flooring Type',
+    'parking_space': 'Parking Space',
+    'study_room': 'Study Room',
+    'servant_room': 'Servant Room',
+    'storage_room': 'Storage Room',
+    'pooja_room': 'Pooja Room',
+    'others': 'Others',
+    'location': 'Location',
+    'floor_category': 'Floor Category',
+    'luxury_category': 'Luxury Category'
+}
+AGGREGATE_KEYS = list(COLUMN_DISPLAY_NAMES) + [('location', 'bedrooms')]
+
+# Scatter plots above this many points are downsampled (or drawn as a density map)
+SCATTER_MAX_POINTS = 10000
+DENSITY_BINS = 64
+
+
+def _stats(sorted_prices):
+    return [
+        len(sorted_prices),
+        float(sorted_prices.mean()),
+        float(np.quantile(sorted_prices, 0.5)),
+        float(np.quantile(sorted_prices, 0.25)),
+        float(np.quantile(sorted_prices, 0.75)),
+    ]
+
+
+def _as_columns(key):
+    return [key] if isinstance(key, str) else list(key)
+
+
+class PriceAggregates:
+    def __init__(self, df, keys, value="price"):
+        self.value = value
+        self._prices = {}  # key -> {group tuple: sorted price array}
+        self._stats = {}   # key -> {group tuple: STAT_COLUMNS values}
+        self._tables = {}  # key -> summary DataFrame
+        for key in keys:
+            self._prices[key] = {}
+            self._stats[key] = {}
+            self._update(key, df)
+
+    def _update(self, key, df):
+        prices_by_group, stats_by_group = self._prices[key], self._stats[key]
+        for group, prices in df.groupby(_as_columns(key), observed=True)[self.value]:
+            group = group if isinstance(group, tuple) else (group,)
+            existing = prices_by_group.get(group, np.empty(0))
+            new_prices = np.sort(prices.to_numpy(dtype=np.float64))
+            merged = np.insert(existing, np.searchsorted(existing, new_prices), new_prices)
+            prices_by_group[group] = merged
+            stats_by_group[group] = _stats(merged)
+        rows = [list(group) + stats for group, stats in sorted(stats_by_group.items())]
+        self._tables[key] = pd.DataFrame(rows, columns=_as_columns(key) + STAT_COLUMNS)
+
+    def table(self, key):
+        """Summary table for ``key``: the key column(s) followed by ``STAT_COLUMNS``."""
+        return self._tables[key]
+
+    def append(self, new_df):
+        """Fold new listings into every aggregate, recomputing only the affected groups."""
+        for key in self._prices:
+            self._update(key, new_df)
+
+    def copy(self):
+        """Independent copy; price arrays are shared since updates replace them rather than write into them."""
+        other = PriceAggregates.__new__(PriceAggregates)
+        other.value = self.value
+        other._prices = {key: dict(groups) for key, groups in self._prices.items()}
+        other._stats = {key: dict(groups) for key, groups in self._stats.items()}
+        other._tables = dict(self._tables)
+        return other
+
+
+def density_grid(df, x, y, bins=DENSITY_BINS):
+    """Listing counts on a ``bins`` x ``bins`` grid of ``x`` / ``y``.
+
+    Returns (counts indexed [y bin, x bin], x bin centres, y bin centres).
+    """
+    counts, x_edges, y_edges = np.histogram2d(
+        df[x].to_numpy(dtype=np.float64), df[y].to_numpy(dtype=np.float64), bins=bins
+    )
+    return counts.T, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+
+def downsample_by_density(df, x, y, max_points=SCATTER_MAX_POINTS, bins=DENSITY_BINS, seed=0):
+    """Sample ``df`` down to about ``max_points`` rows, stratified over a
+    ``bins`` x ``bins`` grid of ``x`` / ``y``.
+
+    Each occupied cell keeps a share of its rows proportional to its count, and
+    at least one, so dense regions stay dense and outliers are not dropped. The
+    result has at most ``max_points + bins ** 2`` rows.
+    """
+    if len(df) <= max_points:
+        return df
+    cells = np.zeros(len(df), dtype=np.int64)
+    for col in (x, y):
+        values = df[col].to_numpy(dtype=np.float64)
+        edges = np.linspace(np.nanmin(values), np.nanmax(values), bins + 1)[1:-1]
+        cells = cells * bins + np.searchsorted(edges, values, side="right")
+    counts = np.bincount(cells)
+    quota = np.maximum(1, np.round(counts * (max_points / len(df)))).astype(np.int64)
+
+    # Random rank of each row within its cell; keep the first ``quota`` of each
+    order = np.random.default_rng(seed).permutation(len(df))
+    order = order[np.argsort(cells[order], kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(df)) - starts[cells[order]]
+    keep = np.sort(order[rank < quota[cells[order]]])
+    return df.iloc[keep]
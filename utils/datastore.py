@@ -0,0 +1,121 @@
+"""Typed columnar copies of the tabular datasets.
+
+The datasets ship as CSV files (with an ``.xls`` extension) that every run
+used to re-parse. ``convert`` writes a Parquet copy next to each one:
+
+- columns get the compact dtypes of ``utils.dtypes.SCHEMAS``
+- other low-cardinality string columns are dictionary-encoded (pandas ``category``)
+- stringified Python lists (``features``, ``nearby_locations``) are stored as
+  real ``list<string>`` columns, parsed once
+
+``read_dataset`` reads the Parquet copy, optionally only the requested
+columns, and re-converts first whenever the CSV is newer (e.g. after
+``python -m utils.similarity_builder append``), so the CSV stays the source
+of truth.
+
+    python -m utils.datastore            # convert every dataset
+    python -m utils.datastore analytics  # or just some of them
+"""
+import argparse
+import ast
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.dtypes import SCHEMAS, compact, memory_mb
+from utils.fileio import atomic_write
+
+DATASETS = {
+    "recommendation": Path("datasets/page_2/Recomendation_system_final_data.xls"),
+    "analytics": Path("datasets/page_3/analystics_module_data.xls"),
+    "map_mean": Path("datasets/page_3/avg_agg_map_df.xls"),
+    "map_median": Path("datasets/page_3/median_agg_map_df.xls"),
+}
+LIST_COLUMNS = {
+    "recommendation": ["features", "nearby_locations"],
+}
+# String columns with fewer distinct values than this share of rows are dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+
+
+def parquet_path(name):
+    return DATASETS[name].with_suffix(".parquet")
+
+
+def parse_list(value):
+    """Turn a stringified Python list (or a real list/array) into stripped string tokens.
+
+    A string that is not a Python literal is read as comma-separated tokens;
+    missing values give an empty list.
+    """
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            value = value.split(",")
+    if isinstance(value, (list, tuple, np.ndarray)):
+        items = value
+    elif value is None or pd.isna(value):
+        return []
+    else:
+        items = [value]
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def to_columnar(df, list_columns=(), schema=None):
+    """Apply ``schema``, parse list columns and dictionary-encode low-cardinality string columns."""
+    df = compact(df.copy(), schema or {})
+    for col in list_columns:
+        df[col] = df[col].map(parse_list)
+    for col in df.columns:
+        if col in list_columns or pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        if df[col].nunique() < CATEGORY_MAX_RATIO * len(df):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def convert(name):
+    """Write the Parquet copy of one dataset.
+
+    Returns the memory (MB) of the dataset parsed with default dtypes and with
+    the columnar/compact ones.
+    """
+    raw = pd.read_csv(DATASETS[name])
+    df = to_columnar(raw, LIST_COLUMNS.get(name, ()), SCHEMAS.get(name))
+    with atomic_write(parquet_path(name)) as f:
+        df.to_parquet(f, engine="pyarrow", index=False)
+    return memory_mb(raw), memory_mb(df)
+
+
+def is_stale(name):
+    path = parquet_path(name)
+    return not path.exists() or path.stat().st_mtime < DATASETS[name].stat().st_mtime
+
+
+def read_dataset(name, columns=None):
+    """Read a dataset from its Parquet copy, converting it first if missing or stale."""
+    if is_stale(name):
+        convert(name)
+    df = pd.read_parquet(parquet_path(name), engine="pyarrow", columns=columns)
+    return compact(df, SCHEMAS.get(name, {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the CSV datasets to Parquet.")
+    parser.add_argument("names", nargs="*", help=f"datasets to convert (default: all of {', '.join(DATASETS)})")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(DATASETS)
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+
+    for name in args.names or DATASETS:
+        before, after = convert(name)
+        path = parquet_path(name)
+        print(f"{name}: {DATASETS[name].stat().st_size / 1e6:.2f} MB CSV -> {path.stat().st_size / 1e6:.2f} MB "
+              f"Parquet; in memory {before:.2f} MB -> {after:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compact in-memory dtypes for the listing DataFrames.
+
+Parsed with defaults, every string column is a Python object per row and
+every number is 64-bit. ``SCHEMAS`` pins each dataset's columns to the
+smallest dtype that holds them:
+
+- low-cardinality strings -> ``category``
+- flags and small counts -> ``int8`` / ``int16``
+- prices and areas -> ``float32`` (plenty for two-decimal crores and sq.ft.)
+
+``utils.datastore`` applies the schema when it writes and reads the Parquet
+copies, so every page gets the compact frames; converting a dataset reports
+its memory with default and with compact dtypes.
+"""
+import numpy as np
+
+SCHEMAS = {
+    "analytics": {
+        'price': 'float32',
+        'bedrooms': 'int8',
+        'bathrooms': 'int8',
+        'balconies': 'category',
+        'facing': 'category',
+        'age_of_property': 'category',
+        'furnishing_status': 'category',
+        'flooring_type': 'category',
+        'parking_space': 'category',
+        'built_up_area': 'float32',
+        'study_room': 'int8',
+        'servant_room': 'int8',
+        'storage_room': 'int8',
+        'pooja_room': 'int8',
+        'others': 'int8',
+        'location': 'category',
+        'floor_category': 'category',
+        'luxury_category': 'category',
+    },
+    "recommendation": {
+        'price_per_sqft': 'float32',
+        'place': 'category',
+        'property_type': 'category',
+        'price': 'float32',
+        'bedrooms': 'int8',
+        'bathrooms': 'int8',
+        'balconies': 'category',
+        'age_possession': 'category',
+        'furnish_label': 'category',
+        'parking_availability': 'category',
+        'built_up_area': 'float32',
+        'luxury_score': 'int16',
+    },
+}
+
+
+def memory_mb(df):
+    return float(df.memory_usage(deep=True).sum() / 2**20)
+
+
+def compact(df, schema):
+    """Cast the columns of ``df`` named in ``schema``; others are left as they are.
+
+    Integer columns with missing values (e.g. from appended listings) fall
+    back to ``float32`` instead of failing.
+    """
+    casts = {}
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype != 'category' and np.dtype(dtype).kind == 'i' and df[col].isna().any():
+            dtype = 'float32'
+        casts[col] = dtype
+    return df.astype(casts) if casts else df
+
@@ -0,0 +1,81 @@
+"""Precomputed input schema for the Price Prediction page.
+
+Holds the sorted dropdown vocabularies, numeric ranges and widget defaults
+derived once from ``df.pkl``, so the page neither keeps the training frame in
+memory nor re-sorts its columns on every rerun.
+
+    python -m utils.feature_schema
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.fileio import atomic_write
+from utils.prediction import FEATURE_COLUMNS, to_python
+
+DF_PATH = Path("datasets/page_1/df.pkl")
+SCHEMA_PATH = Path("datasets/page_1/feature_schema.json")
+
+VOCABULARY_COLUMNS = [
+    'location', 'bedrooms', 'bathrooms', 'balconies', 'age_of_property', 'furnishing_status',
+    'parking_space', 'flooring_type', 'luxury_category', 'floor_category', 'storage_room', 'pooja_room'
+]
+RANGE_COLUMNS = ['built_up_area']
+DEFAULT_BUILT_UP_AREA = 1000
+
+
+def build_schema(df):
+    vocabularies = {
+        col: [to_python(value) for value in sorted(df[col].dropna().unique())]
+        for col in VOCABULARY_COLUMNS
+    }
+    ranges = {
+        col: {
+            "min": float(df[col].min()),
+            "max": float(df[col].max()),
+            "median": float(df[col].median()),
+        }
+        for col in RANGE_COLUMNS
+    }
+    defaults = {col: values[0] for col, values in vocabularies.items() if values}
+    defaults['built_up_area'] = DEFAULT_BUILT_UP_AREA
+    return {"vocabularies": vocabularies, "ranges": ranges, "defaults": defaults, "n_rows": len(df)}
+
+
+def save_schema(schema, path=SCHEMA_PATH):
+    with atomic_write(path, "w") as f:
+        json.dump(schema, f, indent=2)
+
+
+def load_schema(path=SCHEMA_PATH, df_path=DF_PATH):
+    """Load the schema, deriving it from ``df.pkl`` the first time."""
+    path = Path(path)
+    if not path.exists():
+        save_schema(build_schema(pd.read_pickle(df_path)), path)
+    return json.loads(path.read_text())
+
+
+def sample_frame(schema, n=200, seed=0):
+    """Deterministic synthetic inputs covering the schema, for model sanity checks."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in FEATURE_COLUMNS:
+        if col in schema["vocabularies"]:
+            values = schema["vocabularies"][col]
+            data[col] = [values[i] for i in rng.integers(0, len(values), n)]
+        else:
+            bounds = schema["ranges"][col]
+            data[col] = np.round(rng.uniform(bounds["min"], bounds["max"], n))
+    return pd.DataFrame(data, columns=FEATURE_COLUMNS)
+
+
+def main():
+    schema = build_schema(pd.read_pickle(DF_PATH))
+    save_schema(schema)
+    print(f"Wrote {SCHEMA_PATH} ({len(schema['vocabularies'])} vocabularies from {schema['n_rows']} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Shared data access for the feedback database.
+
+Every page goes through this module instead of opening its own ``sqlite3``
+connection:
+
+- one connection pool per process and database file, so reruns reuse open
+  connections (and their compiled-statement caches) instead of reconnecting
+- WAL journaling, so readers never block the writer, and a busy timeout, so
+  concurrent writers wait instead of failing with "database is locked"
+- schema changes are numbered ``MIGRATIONS`` applied once per database
+  (tracked in ``PRAGMA user_version``), not ``CREATE TABLE IF NOT EXISTS``
+  on every call
+- SQL text is fixed and parameterised, so each statement is compiled once per
+  connection and then reused from sqlite3's statement cache
+- form submissions go through a background ``FeedbackWriter`` that
+  group-commits queued inserts, so the script thread never waits on the
+  write lock
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+DB_PATH = Path("datasets/page_5/feedback.db").resolve()
+POOL_SIZE = 4
+BUSY_TIMEOUT_SECONDS = 5.0
+STATEMENT_CACHE_SIZE = 64
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_SIZE = 256
+WRITE_RETRIES = 3
+ENQUEUE_TIMEOUT_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+# (version, script) pairs, applied in order to databases below that version.
+MIGRATIONS = [
+    # 1: one canonical feedback table. Pages disagreed on the rating type
+    # (INTEGER vs REAL) while the form submits fractional ratings, so rebuild
+    # the table with a REAL rating, keeping ids.
+    (1, """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            feedback TEXT,
+            rating REAL
+        );
+        CREATE TABLE feedback_v1 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            feedback TEXT NOT NULL,
+            rating REAL NOT NULL
+        );
+        INSERT INTO feedback_v1 (id, name, feedback, rating)
+            SELECT id, COALESCE(name, ''), COALESCE(feedback, ''), CAST(COALESCE(rating, 0) AS REAL)
+            FROM feedback;
+        UPDATE sqlite_sequence
+            SET seq = MAX(seq, (SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'feedback'))
+            WHERE name = 'feedback_v1';
+        DROP TABLE feedback;
+        ALTER TABLE feedback_v1 RENAME TO feedback;
+    """),
+    # 2: summary rows kept in step with feedback by triggers, in the same
+    # transaction as each insert/delete, so stats are O(1) to read.
+    (2, """
+        CREATE TABLE feedback_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            review_count INTEGER NOT NULL,
+            rating_sum REAL NOT NULL
+        );
+        INSERT INTO feedback_summary (id, review_count, rating_sum)
+            SELECT 1, COUNT(*), COALESCE(SUM(rating), 0) FROM feedback;
+        CREATE TABLE feedback_histogram (
+            stars INTEGER PRIMARY KEY,
+            review_count INTEGER NOT NULL
+        );
+        WITH RECURSIVE stars(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM stars WHERE n < 5)
+            INSERT INTO feedback_histogram (stars, review_count)
+            SELECT n, (SELECT COUNT(*) FROM feedback WHERE MIN(5, MAX(1, CAST(rating AS INTEGER))) = n)
+            FROM stars;
+        CREATE TRIGGER feedback_summary_insert AFTER INSERT ON feedback BEGIN
+            UPDATE feedback_summary SET review_count = review_count + 1, rating_sum = rating_sum + NEW.rating;
+            UPDATE feedback_histogram SET review_count = review_count + 1
+                WHERE stars = MIN(5, MAX(1, CAST(NEW.rating AS INTEGER)));
+        END;
+        CREATE TRIGGER feedback_summary_delete AFTER DELETE ON feedback BEGIN
+            UPDATE feedback_summary SET review_count = review_count - 1, rating_sum = rating_sum - OLD.rating;
+            UPDATE feedback_histogram SET review_count = review_count - 1
+                WHERE stars = MIN(5, MAX(1, CAST(OLD.rating AS INTEGER)));
+        END;
+        CREATE TRIGGER feedback_summary_update AFTER UPDATE OF rating ON feedback BEGIN
+            UPDATE feedback_summary SET rating_sum = rating_sum - OLD.rating + NEW.rating;
+            UPDATE feedback_histogram SET review_count = review_count - 1
+                WHERE stars = MIN(5, MAX(1, CAST(OLD.rating AS INTEGER)));
+            UPDATE feedback_histogram SET review_count = review_count + 1
+                WHERE stars = MIN(5, MAX(1, CAST(NEW.rating AS INTEGER)));
+        END;
+    """),
+    # 3: submission time (NULL for rows older than this migration) and
+    # indexes for the Feedback Wall's rating/date filters.
+    (3, """
+        ALTER TABLE feedback ADD COLUMN created_at TEXT;
+        CREATE INDEX feedback_rating_id ON feedback (rating, id);
+        CREATE INDEX feedback_created_at_id ON feedback (created_at, id);
+    """),
+    # 4: FTS5 index over names and comments (external content, so the text is
+    # stored once), kept in step with feedback by triggers.
+    (4, """
+        CREATE VIRTUAL TABLE feedback_fts USING fts5(
+            name, feedback, content='feedback', content_rowid='id'
+        );
+        INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild');
+        CREATE TRIGGER feedback_fts_insert AFTER INSERT ON feedback BEGIN
+            INSERT INTO feedback_fts (rowid, name, feedback) VALUES (NEW.id, NEW.name, NEW.feedback);
+        END;
+        CREATE TRIGGER feedback_fts_delete AFTER DELETE ON feedback BEGIN
+            INSERT INTO feedback_fts (feedback_fts, rowid, name, feedback)
+                VALUES ('delete', OLD.id, OLD.name, OLD.feedback);
+        END;
+        CREATE TRIGGER feedback_fts_update AFTER UPDATE OF name, feedback ON feedback BEGIN
+            INSERT INTO feedback_fts (feedback_fts, rowid, name, feedback)
+                VALUES ('delete', OLD.id, OLD.name, OLD.feedback);
+            INSERT INTO feedback_fts (rowid, name, feedback) VALUES (NEW.id, NEW.name, NEW.feedback);
+        END;
+    """),
+]
+
+SELECT_FEEDBACK = "SELECT id, name, feedback, rating, created_at FROM feedback ORDER BY id"
+# Newest first, one page after the ``before_id`` cursor. Walking the primary key
+# down from the cursor suits unselective filters; a selective rating filter
+# reads its matches from feedback_rating_id instead and sorts them. The date
+# filter is turned into an id lower bound read from feedback_created_at_id, so
+# the walk stops at the oldest matching row instead of the start of the table.
+FEEDBACK_PAGE_SQL = """
+    SELECT id, name, feedback, rating, created_at FROM feedback {index}
+    WHERE id < :before_id AND rating >= :min_rating {since}
+    ORDER BY id DESC LIMIT :limit
+"""
+SINCE_CLAUSE = """
+    AND created_at >= :since
+    AND id >= (SELECT MIN(id) FROM feedback INDEXED BY feedback_created_at_id WHERE created_at >= :since)
+"""
+# (use the rating index, filter on date) -> statement
+SELECT_FEEDBACK_PAGE = {
+    (by_rating, by_date): FEEDBACK_PAGE_SQL.format(
+        index="INDEXED BY feedback_rating_id" if by_rating else "",
+        since=SINCE_CLAUSE if by_date else "",
+    )
+    for by_rating in (False, True)
+    for by_date in (False, True)
+}
+# Use the rating index when at most this share of rows can match the filter
+RATING_INDEX_MAX_SHARE = 0.2
+INSERT_FEEDBACK = """
+    INSERT INTO feedback (name, feedback, rating, created_at)
+    VALUES (?, ?, ?, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+"""
+DELETE_FEEDBACK = "DELETE FROM feedback WHERE id = ?"
+FEEDBACK_SUMMARY = "SELECT review_count, rating_sum FROM feedback_summary WHERE id = 1"
+FEEDBACK_HISTOGRAM = "SELECT stars, review_count FROM feedback_histogram ORDER BY stars"
+
+
+class ConnectionPool:
+    """At most ``size`` connections to one SQLite file, shared across threads.
+
+    Connections are created lazily and handed out one caller at a time, so
+    each is used by a single thread at any moment.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = Path(path)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_SECONDS * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection (autocommit mode) for reads."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection inside ``BEGIN IMMEDIATE`` ... ``COMMIT``.
+
+        Taking the write lock up front means a transaction never fails half-way
+        when upgrading from a read lock; other writers wait up to the busy timeout.
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _statements(script):
+    """Split a script into complete statements (``;`` inside triggers is kept)."""
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                yield statement
+            statement = ""
+
+
+def migrate(pool):
+    """Bring the database up to the latest ``MIGRATIONS`` version."""
+    with pool.transaction() as conn:
+        # Re-read under the write lock, in case another process just migrated
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, script in MIGRATIONS:
+            if target > version:
+                for statement in _statements(script):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={target}")
+                version = target
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_PATH):
+    """The process-wide pool for ``path``, created (and migrated) on first use."""
+    path = Path(path).resolve()
+    with _pools_lock:
+        if path not in _pools:
+            pool = ConnectionPool(path)
+            migrate(pool)
+            _pools[path] = pool
+        return _pools[path]
+
+
+def load_feedback(path=DB_PATH):
+    with get_pool(path).connection() as conn:
+        return pd.read_sql_query(SELECT_FEEDBACK, conn)
+
+
+def add_feedback(name, feedback, rating, path=DB_PATH):
+    with get_pool(path).transaction() as conn:
+        conn.execute(INSERT_FEEDBACK, (name, feedback, float(rating)))
+
+
+def feedback_page(before_id=None, limit=20, min_rating=0, since=None, path=DB_PATH):
+    """One page of feedback, newest first, using the id as a keyset cursor.
+
+    Pass the last ``id`` of a page as ``before_id`` to get the next one; the
+    cost is independent of how deep the page is. ``since`` is an ISO date.
+    """
+    params = {
+        "before_id": (2**63 - 1) if before_id is None else int(before_id),
+        "min_rating": float(min_rating),
+        "since": since,
+        "limit": int(limit),
+    }
+    with get_pool(path).connection() as conn:
+        by_rating = min_rating > 0 and _rating_share(conn, min_rating) <= RATING_INDEX_MAX_SHARE
+        query = SELECT_FEEDBACK_PAGE[by_rating, since is not None]
+        return pd.read_sql_query(query, conn, params=params)
+
+
+def _rating_share(conn, min_rating):
+    """Upper bound on the share of rows rated ``min_rating`` or more, from the histogram."""
+    counts = dict(conn.execute(FEEDBACK_HISTOGRAM).fetchall())
+    total = sum(counts.values())
+    matching = sum(count for stars, count in counts.items() if stars >= int(min_rating))
+    return matching / total if total else 0
+
+
+def delete_feedback(feedback_ids, path=DB_PATH):
+    """Delete several feedback rows in a single transaction."""
+    with get_pool(path).transaction() as conn:
+        conn.executemany(DELETE_FEEDBACK, [(int(feedback_id),) for feedback_id in feedback_ids])
+
+
+def feedback_stats(path=DB_PATH):
+    """Return (average rating, review count) from the trigger-maintained summary."""
+    with get_pool(path).connection() as conn:
+        count, rating_sum = conn.execute(FEEDBACK_SUMMARY).fetchone()
+    return (rating_sum / count if count else 0), count
+
+
+def rating_histogram(path=DB_PATH):
+    """Review count per whole star (1-5; fractional ratings round down)."""
+    with get_pool(path).connection() as conn:
+        return dict(conn.execute(FEEDBACK_HISTOGRAM).fetchall())
+
+
+class FeedbackWriter:
+    """Background thread that inserts queued feedback in group commits.
+
+    ``submit`` only enqueues, so it returns immediately; the writer takes
+    whatever has queued up (up to ``batch_size`` rows) and inserts it in one
+    transaction, so a burst of submissions costs a few commits instead of one
+    each. The queue is bounded: when it is full, ``submit`` waits up to
+    ``timeout`` and then raises ``queue.Full`` so the caller can ask the user
+    to retry. A batch that fails is logged and counted in ``failed``; if the
+    thread has died anyway, the next ``submit`` starts a new one. Pending
+    rows are flushed when the process exits.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path=DB_PATH, maxsize=WRITE_QUEUE_SIZE, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self._ensure_running()
+        atexit.register(self.close)
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Feedback writer is closed")
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    logger.error("Feedback writer thread died; restarting it")
+                self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, name, feedback, rating, timeout=ENQUEUE_TIMEOUT_SECONDS):
+        self._ensure_running()
+        self._queue.put((name, feedback, float(rating)), timeout=timeout)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with get_pool(self.path).transaction() as conn:
+                    conn.executemany(INSERT_FEEDBACK, rows)
+                self.written += len(rows)
+                return
+            except sqlite3.OperationalError:
+                # Busy timeout exceeded; back off and retry the whole batch
+                if attempt == WRITE_RETRIES - 1:
+                    self.failed += len(rows)
+                    logger.exception("Dropping %d feedback rows after %d attempts", len(rows), WRITE_RETRIES)
+                else:
+                    time.sleep(0.1 * 2**attempt)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is self._STOP
+            rows = batch[:-1] if stop else batch
+            try:
+                if rows:
+                    self._write(rows)
+            except Exception:
+                # e.g. a constraint violation: retrying would fail the same way
+                self.failed += len(rows)
+                logger.exception("Dropping %d feedback rows", len(rows))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the thread (idempotent)."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path=DB_PATH):
+    """The process-wide background writer for ``path``."""
+    path = Path(path).resolve()
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = FeedbackWriter(path)
+        return _writers[path]
@@ -0,0 +1,25 @@
+"""Atomic file replacement for artifacts written while the app may be reading them."""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(path, mode="wb"):
+    """Open a unique temporary file next to ``path`` and move it over ``path`` on success.
+
+    ``mkstemp`` gives every writer its own temporary name, so processes
+    rebuilding the same artifact at once cannot clobber each other's
+    partial files; the last ``os.replace`` wins.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,112 @@
+"""Spatial binning of listing prices for the Analysis geomap.
+
+Listings carry a locality name only, so ``attach_coordinates`` places each
+one at its locality's coordinates. ``add_grid_cells`` then assigns every
+listing a geohash cell at each grid resolution once, and
+``aggregate_cells`` computes the requested metric per locality or per cell
+on demand, so any metric / resolution combination is a single groupby
+instead of a precomputed file. ``in_viewport`` keeps only the cells inside
+the visible window before they are sent to the browser.
+"""
+import numpy as np
+import pandas as pd
+
+BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+
+# Label -> geohash precision (None = one point per locality)
+GRID_RESOLUTIONS = {
+    "Locality": None,
+    "~20 km cells": 4,
+    "~5 km cells": 5,
+    "~1 km cells": 6,
+}
+# Label -> "mean" or the quantile to compute
+METRICS = {
+    "Mean": "mean",
+    "Median": 0.5,
+    "25th percentile": 0.25,
+    "75th percentile": 0.75,
+    "90th percentile": 0.9,
+}
+VALUE_COLUMNS = {
+    'price': 'Price',
+    'price_per_sqft': 'Price Per Sq.Ft.',
+    'built_up_area': 'Built Up Area',
+}
+
+
+def geohash_cells(lat, lon, precision):
+    """Geohash of each point at ``precision`` characters, plus the cell centres.
+
+    Returns ``(cells, center_lat, center_lon)`` as arrays.
+    """
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_q = np.clip(((np.asarray(lon, dtype=np.float64) + 180) / 360 * 2**lon_bits).astype(np.int64),
+                    0, 2**lon_bits - 1)
+    lat_q = np.clip(((np.asarray(lat, dtype=np.float64) + 90) / 180 * 2**lat_bits).astype(np.int64),
+                    0, 2**lat_bits - 1)
+
+    # Interleave longitude and latitude bits, longitude first
+    code = np.zeros(len(lon_q), dtype=np.int64)
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lon_q >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    cells = BASE32[(code >> (5 * (precision - 1))) & 31]
+    for j in range(1, precision):
+        cells = np.char.add(cells, BASE32[(code >> (5 * (precision - 1 - j))) & 31])
+    center_lat = (lat_q + 0.5) / 2**lat_bits * 180 - 90
+    center_lon = (lon_q + 0.5) / 2**lon_bits * 360 - 180
+    return cells, center_lat, center_lon
+
+
+def attach_coordinates(listings, localities):
+    """Join listings to locality coordinates (``Location``, ``Latitude``, ``Longitude``).
+
+    Listings whose locality has no coordinates are dropped.
+    """
+    coordinates = pd.DataFrame({
+        'location': localities['Location'].astype(str).str.strip().str.lower(),
+        'latitude': localities['Latitude'].to_numpy(dtype=np.float64),
+        'longitude': localities['Longitude'].to_numpy(dtype=np.float64),
+    }).drop_duplicates('location')
+    geo = listings.assign(location=listings['location'].astype(str)).merge(coordinates, on='location')
+    return geo.assign(price_per_sqft=(geo['price'].astype(np.float64) * 1e7 / geo['built_up_area']).astype(np.float32))
+
+
+def add_grid_cells(geo, resolutions=GRID_RESOLUTIONS):
+    """Add ``cell_<precision>`` (and its centre) columns for every grid resolution."""
+    columns = {}
+    for precision in resolutions.values():
+        if precision is None:
+            continue
+        cells, center_lat, center_lon = geohash_cells(geo['latitude'], geo['longitude'], precision)
+        columns[f'cell_{precision}'] = pd.Categorical(cells)
+        columns[f'cell_{precision}_lat'] = center_lat
+        columns[f'cell_{precision}_lon'] = center_lon
+    return geo.assign(**columns)
+
+
+def aggregate_cells(geo, precision, metric):
+    """One row per locality (``precision=None``) or geohash cell with the
+    ``metric`` of each value column, the listing count and the point to plot."""
+    if precision is None:
+        key, lat, lon = 'location', 'latitude', 'longitude'
+    else:
+        key, lat, lon = f'cell_{precision}', f'cell_{precision}_lat', f'cell_{precision}_lon'
+    grouped = geo.groupby(key, observed=True)
+    values = grouped[list(VALUE_COLUMNS)]
+    stats = values.mean() if metric == "mean" else values.quantile(metric)
+    points = grouped.agg(Listings=('price', 'size'), Latitude=(lat, 'first'), Longitude=(lon, 'first'))
+    cells = stats.rename(columns=VALUE_COLUMNS).join(points)
+    cells.index.name = 'Location'
+    return cells.reset_index()
+
+
+def in_viewport(cells, lat_range, lon_range):
+    """Cells whose plotted point lies inside the given latitude / longitude window."""
+    return cells[cells['Latitude'].between(*lat_range) & cells['Longitude'].between(*lon_range)]
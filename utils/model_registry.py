@@ -0,0 +1,181 @@
+"""Versioned model registry for the price predictor.
+
+Each version lives in its own directory:
+
+    datasets/page_1/model_registry/
+        CURRENT                 # name of the active version
+        <version>/
+            booster.ubj         # XGBoost booster in its native UBJSON format
+            quantiles.ubj       # optional multi-quantile booster for price bands
+            preprocessor.json   # one-hot maps and StandardScaler constants
+            feature_schema.json # optional input vocabularies/ranges the version was trained on
+            manifest.json       # version, creation time and sha256 of each file
+
+Loading a version is a native booster load plus a small JSON read (no
+sklearn unpickling), and switching ``CURRENT`` hot-swaps the model served by
+running apps on their next rerun.
+
+    python -m utils.model_registry export datasets/page_1/xgbmodel.pkl --activate
+    python -m utils.model_registry list
+    python -m utils.model_registry activate <version>
+"""
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import xgboost as xgb
+
+from utils import feature_schema
+from utils.fileio import atomic_write
+from utils.prediction import CompiledPredictor, load_pipeline
+
+REGISTRY_DIR = Path("datasets/page_1/model_registry")
+CURRENT_FILE = "CURRENT"
+BOOSTER_FILE = "booster.ubj"
+QUANTILE_BOOSTER_FILE = "quantiles.ubj"
+PREPROCESSOR_FILE = "preprocessor.json"
+SCHEMA_FILE = "feature_schema.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def _sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _write_atomic(path, text):
+    with atomic_write(path, "w") as f:
+        f.write(text)
+
+
+def export_predictor(predictor, version=None, registry_dir=REGISTRY_DIR, metadata=None, schema=None):
+    """Save a ``CompiledPredictor`` (and the input ``schema`` of its training
+    data) as a new registry version and return its name."""
+    version = version or time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    version_dir = Path(registry_dir) / version
+    if version_dir.exists():
+        raise FileExistsError(f"Model version already exists: {version}")
+    version_dir.mkdir(parents=True)
+
+    files = [BOOSTER_FILE, PREPROCESSOR_FILE]
+    predictor.booster.save_model(version_dir / BOOSTER_FILE)
+    if predictor.has_bands:
+        predictor.quantile_booster.save_model(version_dir / QUANTILE_BOOSTER_FILE)
+        files.append(QUANTILE_BOOSTER_FILE)
+    (version_dir / PREPROCESSOR_FILE).write_text(json.dumps(predictor.constants))
+    if schema is not None:
+        (version_dir / SCHEMA_FILE).write_text(json.dumps(schema, indent=2))
+        files.append(SCHEMA_FILE)
+    manifest = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "xgboost_version": xgb.__version__,
+        "files": {name: _sha256(version_dir / name) for name in files},
+        "metadata": metadata or {},
+    }
+    _write_atomic(version_dir / MANIFEST_FILE, json.dumps(manifest, indent=2))
+    return version
+
+
+def export_pipeline(pipeline, version=None, registry_dir=REGISTRY_DIR, metadata=None, check_df=None,
+                    quantile_regressor=None, band_offset=0.0, schema=None):
+    """Export a fitted sklearn pipeline (and optional quantile head), optionally
+    checking bit-identical output on ``check_df``."""
+    predictor = CompiledPredictor.from_pipeline(pipeline, quantile_regressor, band_offset)
+    if check_df is not None and not predictor.matches(pipeline, check_df):
+        raise ValueError("Compiled predictor does not reproduce pipeline.predict; not exporting")
+    return export_predictor(predictor, version, registry_dir, metadata, schema)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    registry_dir = Path(registry_dir)
+    if not registry_dir.exists():
+        return []
+    return sorted(p.name for p in registry_dir.iterdir() if (p / MANIFEST_FILE).exists())
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """Active version name, or None if nothing has been activated yet."""
+    current = Path(registry_dir) / CURRENT_FILE
+    return current.read_text().strip() if current.exists() else None
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    registry_dir = Path(registry_dir)
+    if not (registry_dir / version / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Unknown model version: {version}")
+    _write_atomic(registry_dir / CURRENT_FILE, version)
+
+
+def load_manifest(version, registry_dir=REGISTRY_DIR):
+    return json.loads((Path(registry_dir) / version / MANIFEST_FILE).read_text())
+
+
+def load_schema(version=None, registry_dir=REGISTRY_DIR):
+    """Input schema stored with a registry version (the active one by default), or None."""
+    version = version or current_version(registry_dir)
+    if version is None:
+        return None
+    manifest = load_manifest(version, registry_dir)
+    if SCHEMA_FILE not in manifest["files"]:
+        return None
+    path = Path(registry_dir) / version / SCHEMA_FILE
+    if _sha256(path) != manifest["files"][SCHEMA_FILE]:
+        raise ValueError(f"Checksum mismatch for {SCHEMA_FILE} in model version {version}")
+    return json.loads(path.read_text())
+
+
+def load_predictor(version=None, registry_dir=REGISTRY_DIR):
+    """Load a registry version (the active one by default) as a ``CompiledPredictor``."""
+    version = version or current_version(registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No active model version in {registry_dir}")
+    version_dir = Path(registry_dir) / version
+    manifest = load_manifest(version, registry_dir)
+    for name, digest in manifest["files"].items():
+        if _sha256(version_dir / name) != digest:
+            raise ValueError(f"Checksum mismatch for {name} in model version {version}")
+
+    booster = xgb.Booster()
+    booster.load_model(version_dir / BOOSTER_FILE)
+    quantile_booster = None
+    if QUANTILE_BOOSTER_FILE in manifest["files"]:
+        quantile_booster = xgb.Booster()
+        quantile_booster.load_model(version_dir / QUANTILE_BOOSTER_FILE)
+    constants = json.loads((version_dir / PREPROCESSOR_FILE).read_text())
+    return CompiledPredictor(booster, constants, quantile_booster)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage price prediction model versions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="export a pickled sklearn pipeline")
+    export_parser.add_argument("pipeline", type=Path)
+    export_parser.add_argument("--version")
+    export_parser.add_argument("--activate", action="store_true")
+    activate_parser = subparsers.add_parser("activate", help="make a version the served model")
+    activate_parser.add_argument("version")
+    subparsers.add_parser("list", help="list versions")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        schema = feature_schema.load_schema()
+        version = export_pipeline(
+            load_pipeline(args.pipeline), args.version, check_df=feature_schema.sample_frame(schema), schema=schema
+        )
+        print(f"Exported model version {version}")
+        if args.activate:
+            activate(version)
+            print(f"Activated {version}")
+    elif args.command == "activate":
+        activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        active = current_version()
+        for version in list_versions():
+            print(f"{'*' if version == active else ' '} {version}")
+
+
+if __name__ == "__main__":
+    main()
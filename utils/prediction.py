@@ -0,0 +1,390 @@
+"""Price prediction helpers shared by the Price Prediction page and scripts.
+
+    import pandas as pd
+    from utils.prediction import load_pipeline, predict_batch
+
+    pipeline = load_pipeline()
+    results = predict_batch(pipeline, pd.read_csv("listings.csv"))
+"""
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = Path("datasets/page_1/xgbmodel.pkl")
+
+# Input columns expected by the trained pipeline, in the order the page builds them.
+FEATURE_COLUMNS = [
+    'bedrooms', 'bathrooms', 'balconies', 'age_of_property', 'furnishing_status',
+    'flooring_type', 'parking_space', 'built_up_area', 'storage_room',
+    'pooja_room', 'location', 'floor_category', 'luxury_category'
+]
+INTEGER_COLUMNS = ['bedrooms', 'bathrooms', 'storage_room', 'pooja_room']
+FLOAT_COLUMNS = ['built_up_area']
+CATEGORICAL_COLUMNS = [
+    col for col in FEATURE_COLUMNS if col not in INTEGER_COLUMNS + FLOAT_COLUMNS
+]
+# Offered by the page for features the user does not know; the encoder
+# ignores it (all-zero one-hot), in single-row and batch predictions alike.
+NOT_KNOWN = 'Not Known'
+NOT_KNOWN_COLUMNS = ['furnishing_status', 'parking_space', 'flooring_type']
+
+
+def load_pipeline(path=MODEL_PATH):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def model_version(path=MODEL_PATH):
+    """Short fingerprint of the model file; changes whenever it is replaced."""
+    stat = Path(path).stat()
+    return hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def format_price(price):
+    """Prices are predicted in crores; show values under 1 crore in lakhs."""
+    if price < 1:
+        return f"₹ {round(price * 100, 2)} Lakhs"
+    return f"₹ {round(price, 2)} Crores"
+
+
+def model_categories(model):
+    """Categorical column -> values the model was trained on, for the sklearn
+    pipeline or a ``CompiledPredictor``."""
+    if isinstance(model, CompiledPredictor):
+        return {column: list(positions) for column, positions in model.one_hot}
+    preprocessor = model.named_steps['preprocessor']
+    return {
+        column: [to_python(cat) for cat in categories]
+        for _, transformer, columns in preprocessor.transformers_ if hasattr(transformer, "categories_")
+        for column, categories in zip(columns, transformer.categories_)
+    }
+
+
+def validate_batch(df, categories=None):
+    """Check and coerce an uploaded batch.
+
+    ``categories`` (see ``model_categories``) lists the known values of each
+    categorical column; values are matched case-insensitively, ``NOT_KNOWN``
+    is accepted where the page offers it, and any other value (which the
+    encoder would silently ignore) is reported.
+    Returns (valid rows with ``FEATURE_COLUMNS`` only, list of error strings,
+    one per invalid row naming its CSV line, counting the header as line 1,
+    and each bad value). Raises ``ValueError`` when required columns are
+    missing altogether.
+    """
+    missing = [col for col in FEATURE_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    clean = df[FEATURE_COLUMNS].reset_index(drop=True)
+    checks = []  # (invalid mask, column, reason)
+    for col in INTEGER_COLUMNS + FLOAT_COLUMNS:
+        clean[col] = pd.to_numeric(clean[col], errors="coerce")
+        checks.append((clean[col].isna(), col, "is non-numeric or missing"))
+    for col in INTEGER_COLUMNS:
+        checks.append((clean[col] % 1 > 0, col, "is not a whole number"))
+    checks.append((clean['built_up_area'] <= 0, 'built_up_area', "must be greater than 0"))
+    for col in CATEGORICAL_COLUMNS:
+        clean[col] = clean[col].map(lambda value: value.strip() if isinstance(value, str) else value)
+        known = (categories or {}).get(col)
+        if known is None:
+            continue
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in known):
+            clean[col] = pd.to_numeric(clean[col], errors="coerce")
+            checks.append((~clean[col].isin(known), col, "is not a known category"))
+            continue
+        lookup = {str(value).lower(): value for value in known}
+        if col in NOT_KNOWN_COLUMNS:
+            lookup[NOT_KNOWN.lower()] = NOT_KNOWN
+        clean[col] = clean[col].map(lambda value: lookup.get(str(value).lower(), value))
+        checks.append((~clean[col].isin(list(lookup.values())), col, "is not a known category"))
+
+    problems = {}
+    for invalid, col, reason in checks:
+        for position in np.flatnonzero(invalid.to_numpy()):
+            problems.setdefault(position, []).append(f"{col} {df[col].iloc[position]!r} {reason}")
+    errors = [f"CSV line {position + 2}: {'; '.join(problems[position])}" for position in sorted(problems)]
+
+    clean = clean.drop(index=list(problems))
+    clean.index = df.index[clean.index]
+    clean[INTEGER_COLUMNS] = clean[INTEGER_COLUMNS].astype(int)
+    return clean, errors
+
+
+def predict_prices(model, df, chunk_size=10_000):
+    """Vectorised predictions (in crores) for a frame with ``FEATURE_COLUMNS``.
+
+    ``model`` is either the sklearn pipeline or a ``CompiledPredictor``.
+    Returns (prices, bands); bands is a (len(df), n_quantiles) array when the
+    model has quantile heads, computed from the same preprocessed chunk,
+    and None otherwise.
+    """
+    has_bands = isinstance(model, CompiledPredictor) and model.has_bands
+    prices = np.empty(len(df), dtype=np.float64)
+    bands = np.empty((len(df), len(model.quantiles)), dtype=np.float64) if has_bands else None
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        stop = start + len(chunk)
+        if isinstance(model, CompiledPredictor):
+            rows = model.transform_frame(chunk)
+            prices[start:stop] = np.exp(model.predict_log(rows))
+            if has_bands:
+                bands[start:stop] = np.exp(model.predict_log_bands(rows))
+        else:
+            prices[start:stop] = np.exp(model.predict(chunk))
+    return prices, bands
+
+
+def predict_batch(model, df, chunk_size=10_000):
+    """Validate ``df`` and return (results frame, validation errors).
+
+    The results keep the original index and add ``Predicted Price (Cr)``, a
+    formatted ``Predicted Price`` column and, when available, one column per
+    price band (e.g. ``P10 (Cr)``) in front of the input features.
+    """
+    clean, errors = validate_batch(df, model_categories(model))
+    prices, bands = predict_prices(model, clean, chunk_size)
+    results = clean.copy()
+    if bands is not None:
+        for i, quantile in reversed(list(enumerate(model.quantiles))):
+            results.insert(0, f"{_band_name(quantile)} (Cr)", np.round(bands[:, i], 4))
+    results.insert(0, "Predicted Price (Cr)", np.round(prices, 4))
+    results.insert(0, "Predicted Price", [format_price(price) for price in prices])
+    return results, errors
+
+
+class CompiledPredictor:
+    """Fast inference path for the trained sklearn pipeline.
+
+    ``pipeline.predict`` on one row is dominated by DataFrame construction and
+    ColumnTransformer/OneHotEncoder dispatch. This keeps the one-hot
+    category -> column maps and StandardScaler constants, builds the feature
+    vector directly with NumPy and calls the booster in place.
+
+    When the ColumnTransformer produced sparse output at fit time, zero
+    entries were absent (i.e. "missing" to XGBoost), so they are encoded as
+    NaN here to give the same tree paths and bit-identical predictions.
+
+    An optional multi-quantile booster (``reg:quantileerror``) trained on the
+    same preprocessed features yields P10/P50/P90 price bands from the same
+    feature rows, with all quantile heads in one call. The outermost band is
+    widened by the conformal ``band_offset`` (log price) found in training.
+    """
+
+    def __init__(self, booster, constants, quantile_booster=None):
+        self.booster = booster
+        self.quantile_booster = quantile_booster
+        self.constants = constants
+        self.quantiles = constants.get("quantiles", [])
+        self.sparse = constants["sparse"]
+        self.missing = np.nan if self.sparse else constants["missing"]
+        self.iteration_range = tuple(constants["iteration_range"])
+        self.n_features = constants["n_features"]
+        # (column, {category: output position})
+        self.one_hot = [
+            (column, {cat: start + i for i, cat in enumerate(categories)})
+            for column, start, categories in constants["one_hot"]
+        ]
+        # (column, output position, mean, scale)
+        self.scaled = [tuple(entry) for entry in constants["scaled"]]
+
+    @classmethod
+    def from_pipeline(cls, pipeline, quantile_regressor=None, band_offset=0.0):
+        """Compile a fitted pipeline, plus an optional quantile regressor
+        trained on the output of the pipeline's preprocessor."""
+        preprocessor = pipeline.named_steps['preprocessor']
+        regressor = pipeline.named_steps['regressor']
+
+        one_hot, scaled = [], []
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            out = preprocessor.output_indices_[name]
+            if hasattr(transformer, "categories_"):
+                offset = out.start
+                for column, categories in zip(columns, transformer.categories_):
+                    one_hot.append([column, offset, [to_python(cat) for cat in categories]])
+                    offset += len(categories)
+            elif hasattr(transformer, "scale_") or hasattr(transformer, "mean_"):
+                mean = transformer.mean_ if transformer.with_mean else np.zeros(len(columns))
+                scale = transformer.scale_ if transformer.with_std else np.ones(len(columns))
+                for i, column in enumerate(columns):
+                    scaled.append([column, out.start + i, float(mean[i]), float(scale[i])])
+            else:
+                raise ValueError(f"Unsupported transformer in pipeline: {name!r}")
+
+        constants = {
+            "sparse": bool(getattr(preprocessor, "sparse_output_", False)),
+            "missing": float(regressor.missing),
+            "iteration_range": _iteration_range(regressor),
+            "n_features": max(s.stop for s in preprocessor.output_indices_.values()),
+            "one_hot": one_hot,
+            "scaled": scaled,
+        }
+        quantile_booster = None
+        if quantile_regressor is not None:
+            quantile_alpha = quantile_regressor.get_xgb_params()["quantile_alpha"]
+            constants["quantiles"] = [float(q) for q in np.atleast_1d(quantile_alpha)]
+            constants["quantile_iteration_range"] = _iteration_range(quantile_regressor)
+            constants["band_offset"] = float(band_offset)
+            quantile_booster = quantile_regressor.get_booster()
+        return cls(regressor.get_booster(), constants, quantile_booster)
+
+    @property
+    def has_bands(self):
+        return self.quantile_booster is not None
+
+    def transform_row(self, features):
+        """Feature vector for one property given as a {column: value} mapping."""
+        row = np.zeros(self.n_features, dtype=np.float64)
+        for column, positions in self.one_hot:
+            position = positions.get(features[column])
+            if position is not None:
+                row[position] = 1.0
+        for column, position, mean, scale in self.scaled:
+            row[position] = (features[column] - mean) / scale
+        if self.sparse:
+            row[row == 0] = np.nan
+        return row.astype(np.float32)
+
+    def transform_frame(self, df):
+        """Vectorised ``transform_row`` for a DataFrame with ``FEATURE_COLUMNS``."""
+        rows = np.zeros((len(df), self.n_features), dtype=np.float64)
+        for column, positions in self.one_hot:
+            mapped = df[column].map(positions).to_numpy(dtype=np.float64)
+            known = ~np.isnan(mapped)
+            rows[np.flatnonzero(known), mapped[known].astype(np.intp)] = 1.0
+        for column, position, mean, scale in self.scaled:
+            rows[:, position] = (df[column].to_numpy(dtype=np.float64) - mean) / scale
+        if self.sparse:
+            rows[rows == 0] = np.nan
+        return rows.astype(np.float32)
+
+    def predict_log(self, rows):
+        """Raw model output (log price) for a 2-D array of transformed rows."""
+        return self.booster.inplace_predict(rows, iteration_range=self.iteration_range, missing=self.missing)
+
+    def predict_log_bands(self, rows):
+        """Log-price quantiles, shape (len(rows), len(quantiles)), sorted so bands never cross."""
+        bands = self.quantile_booster.inplace_predict(
+            rows, iteration_range=tuple(self.constants["quantile_iteration_range"]), missing=self.missing
+        )
+        bands = np.sort(np.reshape(bands, (len(rows), -1)), axis=1)
+        offset = self.constants.get("band_offset", 0.0)
+        bands[:, 0] -= offset
+        bands[:, -1] += offset
+        return bands
+
+    def predict(self, features):
+        """Predicted price in crores for one property."""
+        return float(np.exp(self.predict_log(self.transform_row(features)[None, :])[0]))
+
+    def predict_with_bands(self, features):
+        """(price, {"P10": ..., "P50": ..., "P90": ...} or None) for one property."""
+        rows = self.transform_row(features)[None, :]
+        price = float(np.exp(self.predict_log(rows)[0]))
+        if not self.has_bands:
+            return price, None
+        bands = np.exp(self.predict_log_bands(rows)[0])
+        return price, {_band_name(q): float(value) for q, value in zip(self.quantiles, bands)}
+
+    def matches(self, pipeline, df):
+        """True if this path gives bit-identical output to ``pipeline.predict``."""
+        expected = pipeline.predict(df[FEATURE_COLUMNS])
+        return np.array_equal(self.predict_log(self.transform_frame(df)), expected)
+
+
+def to_python(value):
+    """Unwrap numpy scalars so values can be written to JSON."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _iteration_range(regressor):
+    try:
+        return [0, regressor.best_iteration + 1]
+    except AttributeError:
+        return [0, 0]
+
+
+def _band_name(quantile):
+    return f"P{round(quantile * 100)}"
+
+
+def _canonical(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def feature_key(features, version):
+    """Stable hash of the model inputs, so 3 and 3.0 or padded strings hit the same entry."""
+    payload = [version] + [_canonical(features[col]) for col in FEATURE_COLUMNS]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache of predictions keyed on the model inputs.
+
+    Entries are tied to a model version; seeing a new version drops every
+    entry computed by the old model.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, features, version, compute):
+        key = feature_key(features, version)
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute(features)
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
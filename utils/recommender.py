@@ -0,0 +1,140 @@
+"""Lookup and scoring helpers for the property recommender.
+
+Single strategies read the per-strategy ``TopKIndex`` objects from
+``utils.similarity``. The "Combined" strategy and society aggregates need
+every pair's score, not just each source's top K, so they compute the exact
+similarity rows of the queried listings from the feature vectors of
+``utils.similarity_builder`` (one sparse/dense product per source) instead of
+materialising a blended n x n matrix.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.similarity import select_topk
+
+# Default blend used by the "Combined" recommendation type.
+DEFAULT_WEIGHTS = {
+    "property_info_based": 0.8,
+    "facility_based": 0.6,
+    "nearby_locations": 1.0,
+}
+
+
+def build_name_index(society_names):
+    """Map each lower-cased society name to the int32 row ids of all its listings.
+
+    Listings with a missing or blank name are left out of the index.
+    """
+    names = pd.Series(society_names, dtype=object).str.lower()
+    codes, uniques = pd.factorize(names.where(names.str.strip().astype(bool)))
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+    order = rows[np.argsort(codes, kind="stable")].astype(np.int32)
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+    return dict(zip(uniques, np.split(order, bounds)))
+
+
+def resolve_rows(name_index, query):
+    """Return the row ids for a society name, or ``[query]`` for a row id."""
+    if isinstance(query, (int, np.integer)):
+        return np.array([query], dtype=np.int32)
+    try:
+        return name_index[str(query).lower()]
+    except KeyError:
+        raise KeyError(f"Unknown society: {query!r}") from None
+
+
+def similarity_rows(matrix, rows):
+    """Exact cosine similarities of ``rows`` against every row of an L2-normalised ``matrix``."""
+    block = matrix[rows] @ matrix.T
+    return (block.toarray() if sparse.issparse(block) else np.asarray(block)).astype(np.float32, copy=False)
+
+
+def combined_scores(vectors, rows, weights=None):
+    """Blend the exact similarity rows of each source.
+
+    ``vectors`` maps each strategy to its row vectors. Returns a
+    (len(rows), n) float32 array of ``sum(weight * cosine)`` over the sources.
+    """
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    rows = np.atleast_1d(np.asarray(rows, dtype=np.intp))
+    n = next(iter(vectors.values())).shape[0]
+
+    out = np.zeros((len(rows), n), dtype=np.float32)
+    for name, weight in weights.items():
+        if not weight:
+            continue
+        out += np.float32(weight) * similarity_rows(vectors[name], rows)
+    return out
+
+
+def top_n(scores, n, exclude=None):
+    """Return (positions, scores) of the ``n`` largest values per row, best first.
+
+    ``scores`` may be 1-D (one query) or 2-D (one row per query). ``exclude``
+    gives a column to drop for each query row, typically the query itself.
+    Ties are broken by lower position so results do not depend on sort order.
+    """
+    single = np.ndim(scores) == 1
+    scores = np.array(scores, dtype=np.float32, ndmin=2)
+    m, n_cols = scores.shape
+    if exclude is not None:
+        scores[np.arange(m), np.broadcast_to(exclude, (m,))] = -np.inf
+        n_cols -= 1
+    n = max(1, min(n, n_cols))
+
+    all_positions = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    positions, ranked = select_topk(all_positions, scores, n)
+    if single:
+        return positions[0], ranked[0]
+    return positions, ranked
+
+
+def rank_properties(indexes, vectors, rows, option, n=5, weights=None, chunk_size=1024):
+    """Rank the ``n`` most similar listings for one or many query rows.
+
+    ``option`` is a strategy name from ``indexes`` or ``"auto"`` for the
+    weighted blend of ``vectors``. Each query row is always excluded from its own results.
+    Returns (row ids, scores) arrays of shape (len(rows), n).
+    """
+    rows = np.atleast_1d(np.asarray(rows, dtype=np.intp))
+    all_ids, all_scores = [], []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if option == "auto":
+            ids, scores = top_n(combined_scores(vectors, chunk, weights), n, exclude=chunk)
+        else:
+            index = indexes[option]
+            candidates = index.indices[chunk]
+            candidate_scores = np.where(candidates == chunk[:, None], -np.inf, index.scores[chunk])
+            order, scores = top_n(candidate_scores, n)
+            ids = np.take_along_axis(candidates, order, axis=1)
+        all_ids.append(ids)
+        all_scores.append(scores)
+    return np.concatenate(all_ids), np.concatenate(all_scores)
+
+
+def recommend(indexes, vectors, name_index, query, option, n=5, weights=None, aggregate=None):
+    """Recommend listings similar to a society name or row id.
+
+    By default the society's first listing is used as the query. With
+    ``aggregate="max"`` or ``"mean"`` the scores of all of the society's
+    listings are combined, and none of its own listings are returned.
+    Returns (row ids, scores) for a single query, best first.
+    """
+    rows = resolve_rows(name_index, query)
+    if aggregate is None or len(rows) == 1:
+        ids, scores = rank_properties(indexes, vectors, rows[0], option, n, weights)
+        return ids[0], scores[0]
+
+    weights = weights if option == "auto" else {option: 1.0}
+    per_listing = combined_scores(vectors, rows, weights)
+    if aggregate == "max":
+        scores = per_listing.max(axis=0)
+    elif aggregate == "mean":
+        scores = per_listing.mean(axis=0)
+    else:
+        raise ValueError(f"Unknown aggregate: {aggregate!r}")
+    scores[rows] = -np.inf
+    return top_n(scores, n)
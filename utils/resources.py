@@ -0,0 +1,185 @@
+"""Process-wide, read-only resources shared by every Streamlit session.
+
+Loaders are wrapped in ``st.cache_resource`` so each process holds exactly one
+copy of the data. Each loader is keyed on the size and modification time of
+the files it reads, so replacing an artifact on disk triggers a reload on the
+next rerun, and ``max_entries`` evicts the superseded copy. ``invalidate()``
+drops everything explicitly, but only in the process that calls it: the
+Feedback page's admin sidebar calls it for the running server, and a script
+run separately cannot reach the server's caches (replace the files instead).
+"""
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from PIL import Image
+
+from utils.analytics import AGGREGATE_KEYS, COLUMN_DISPLAY_NAMES, PriceAggregates
+from utils.datastore import DATASETS, read_dataset
+from utils.dtypes import memory_mb
+from utils.geo import add_grid_cells, attach_coordinates
+from utils.recommender import build_name_index
+from utils.search import sync_listing_index
+from utils.similarity import INDEX_DIR, MANIFEST_PATH, load_indexes, load_manifest
+from utils.similarity_builder import FEATURES_DIR_NAME, load_feature_spaces
+
+RECOMMENDATION_DATA_PATH = DATASETS["recommendation"]
+# Rewritten last whenever the feature vectors are saved
+FEATURE_STATE_PATH = INDEX_DIR / FEATURES_DIR_NAME / "state.json"
+
+ANALYTICS_DATA_PATH = DATASETS["analytics"]
+# Locality coordinates for the geomap (the price columns of this file are unused)
+LOCALITIES_PATH = DATASETS["map_mean"]
+# Only the columns the Analysis page charts are read from the listings
+ANALYTICS_COLUMNS = ['price', 'built_up_area'] + list(COLUMN_DISPLAY_NAMES)
+
+RecommendationData = namedtuple("RecommendationData", ["joined_df", "indexes", "vectors", "society_rows"])
+AnalyticsData = namedtuple("AnalyticsData", ["new_df", "geo_listings", "price_aggregates"])
+
+# Resource name -> {"seconds": load time, "loaded_at": unix timestamp, "memory_mb": frame size}
+LOAD_METRICS = {}
+
+# Most recent analytics load; the listings are append-only, so a reload only
+# folds the new rows into its price aggregates
+_last_analytics = None
+
+
+def file_signature(*paths):
+    """Size and mtime of each path; changes whenever a file is replaced."""
+    signature = []
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            stat = path.stat()
+            signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+        else:
+            signature.append((str(path), None, None))
+    return tuple(signature)
+
+
+def _record_memory(name, *frames):
+    LOAD_METRICS[name]["memory_mb"] = round(sum(memory_mb(df) for df in frames), 3)
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    yield
+    LOAD_METRICS[name] = {
+        "seconds": round(time.perf_counter() - start, 4),
+        "loaded_at": time.time(),
+    }
+
+
+def _freeze(index):
+    index.indices.flags.writeable = False
+    index.scores.flags.writeable = False
+    return index
+
+
+@st.cache_resource(show_spinner="Loading recommendation data...", max_entries=1)
+def _load_recommendation_data(signature):
+    with _timed("recommendation_data"):
+        joined_df = read_dataset("recommendation")
+    _record_memory("recommendation_data", joined_df)
+    with _timed("similarity_index"):
+        indexes = {name: _freeze(index) for name, index in load_indexes().items()}
+    with _timed("feature_vectors"):
+        state, vectors = load_feature_spaces(mmap_mode="r")
+    manifest = load_manifest()
+    if manifest.get("build_id") is None or manifest["build_id"] != state.get("build_id"):
+        # e.g. an index converted from the dense pickles next to the builder's vectors
+        raise ValueError(
+            f"Similarity index (source: {manifest.get('source', 'dense_pickles')}) was not built with the "
+            "saved feature vectors; run 'python -m utils.similarity_builder build'"
+        )
+    n_rows = {len(joined_df)} | {index.n_rows for index in indexes.values()} | {v.shape[0] for v in vectors.values()}
+    if len(n_rows) > 1:
+        raise ValueError(
+            f"Listings ({len(joined_df)} rows) and similarity index are out of sync (an append may be "
+            "in progress); if this persists, run 'python -m utils.similarity_builder build'"
+        )
+    with _timed("society_index"):
+        society_rows = build_name_index(joined_df['society_name'])
+    with _timed("listing_search_index"):
+        sync_listing_index(joined_df)
+    return RecommendationData(joined_df, indexes, vectors, society_rows)
+
+
+def load_recommendation_data():
+    """Listings, top-K similarity indexes, feature vectors and society lookup for the recommender."""
+    return _load_recommendation_data(file_signature(RECOMMENDATION_DATA_PATH, MANIFEST_PATH, FEATURE_STATE_PATH))
+
+
+def _price_aggregates(new_df, previous):
+    """Aggregates of ``new_df``, extending ``previous`` when ``new_df`` only adds rows to its listings."""
+    if previous is not None:
+        n_old = len(previous.new_df)
+        if len(new_df) > n_old and np.array_equal(
+            pd.util.hash_pandas_object(new_df.iloc[:n_old], index=False),
+            pd.util.hash_pandas_object(previous.new_df, index=False),
+        ):
+            price_aggregates = previous.price_aggregates.copy()
+            price_aggregates.append(new_df.iloc[n_old:])
+            return price_aggregates
+    return PriceAggregates(new_df, AGGREGATE_KEYS)
+
+
+@st.cache_resource(show_spinner="Loading analytics data...", max_entries=1)
+def _load_analytics_data(signature):
+    global _last_analytics
+    with _timed("analytics_data"):
+        new_df = read_dataset("analytics", columns=ANALYTICS_COLUMNS)
+        localities = read_dataset("map_mean", columns=['Location', 'Latitude', 'Longitude'])
+    _record_memory("analytics_data", new_df)
+    with _timed("price_aggregates"):
+        price_aggregates = _price_aggregates(new_df, _last_analytics)
+    with _timed("geo_cells"):
+        geo_listings = add_grid_cells(attach_coordinates(new_df, localities))
+    _record_memory("geo_cells", geo_listings)
+    _last_analytics = AnalyticsData(new_df, geo_listings, price_aggregates)
+    return _last_analytics
+
+
+def analytics_signature():
+    """Cache key for anything derived from the analytics datasets (e.g. figures)."""
+    return file_signature(ANALYTICS_DATA_PATH, LOCALITIES_PATH)
+
+
+def load_analytics_data():
+    """Listings, geo-binned listings and price aggregates for the Analysis page."""
+    return _load_analytics_data(analytics_signature())
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_image(path, size, signature):
+    with _timed(f"image:{path}"):
+        image = Image.open(path)
+        image.load()
+        if size is not None:
+            image = image.resize(size)
+    return image
+
+
+def load_image(path, size=None):
+    """Open (and optionally resize) a static image once per process."""
+    return _load_image(str(path), size, file_signature(path))
+
+
+def load_metrics():
+    """Load-time metrics of the resources loaded by this process."""
+    return pd.DataFrame.from_dict(LOAD_METRICS, orient="index")
+
+
+def invalidate():
+    """Drop every cached resource of this process so the next rerun reloads from disk."""
+    global _last_analytics
+    _last_analytics = None
+    _load_recommendation_data.clear()
+    _load_analytics_data.clear()
+    _load_image.clear()
+    LOAD_METRICS.clear()
@@ -0,0 +1,131 @@
+"""Full-text search (SQLite FTS5, BM25-ranked) over feedback and listings.
+
+- Feedback: ``feedback_fts`` lives in the feedback database itself and is
+  kept in step by triggers (migration 4 of ``utils.feedback_store``), so every
+  insert/delete updates the index in the same transaction.
+- Listings: ``listings_fts`` in a separate index file, one row per listing
+  with the listing's row number as ``rowid``. ``sync_listing_index`` indexes
+  only rows appended since the last sync, and rebuilds only when the dataset
+  was replaced.
+
+User input is never passed to ``MATCH`` as-is: ``fts_query`` turns it into
+quoted terms, so punctuation cannot produce FTS syntax errors.
+"""
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.feedback_store import DB_PATH, ConnectionPool, get_pool
+
+LISTINGS_INDEX_PATH = Path("datasets/page_2/listings_search.db")
+LISTING_TEXT_COLUMNS = ['society_name', 'property_name', 'features', 'nearby_locations']
+
+SEARCH_FEEDBACK = """
+    SELECT f.id, f.name, f.feedback, f.rating, f.created_at, bm25(feedback_fts) AS score
+    FROM feedback_fts JOIN feedback AS f ON f.id = feedback_fts.rowid
+    WHERE feedback_fts MATCH ? ORDER BY score LIMIT ?
+"""
+SEARCH_LISTINGS = """
+    SELECT rowid, bm25(listings_fts, 2.0, 2.0, 1.0, 1.0) AS score
+    FROM listings_fts WHERE listings_fts MATCH ? ORDER BY score LIMIT ?
+"""
+LISTINGS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+        society_name, property_name, features, nearby_locations
+    );
+    CREATE TABLE IF NOT EXISTS listings_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        n_rows INTEGER NOT NULL,
+        first_key TEXT
+    );
+"""
+
+_listing_pools = {}
+_listing_pools_lock = threading.Lock()
+
+
+def fts_query(text):
+    """Quoted terms for each word of ``text`` (all must match), or None.
+
+    Only the last word matches as a prefix, for search-as-you-type without
+    expanding every term.
+    """
+    terms = [f'"{term}"' for term in re.findall(r"\w+", str(text).lower())]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_feedback(text, limit=50, path=DB_PATH):
+    """Feedback rows matching ``text``, best BM25 match first."""
+    query = fts_query(text)
+    if query is None:
+        return pd.DataFrame(columns=['id', 'name', 'feedback', 'rating', 'created_at', 'score'])
+    with get_pool(path).connection() as conn:
+        return pd.read_sql_query(SEARCH_FEEDBACK, conn, params=(query, int(limit)))
+
+
+def _listing_pool(path):
+    path = Path(path).resolve()
+    with _listing_pools_lock:
+        if path not in _listing_pools:
+            pool = ConnectionPool(path)
+            with pool.transaction() as conn:
+                for statement in filter(str.strip, LISTINGS_SCHEMA.split(";")):
+                    conn.execute(statement)
+            _listing_pools[path] = pool
+        return _listing_pools[path]
+
+
+def _as_text(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return " ".join(str(item) for item in value)
+    return "" if pd.isna(value) else str(value)
+
+
+def sync_listing_index(df, path=LISTINGS_INDEX_PATH):
+    """Index the rows of ``df`` not indexed yet; returns how many were added.
+
+    The dataset is append-only, so rows already indexed are skipped. If it
+    shrank or its first row changed, the dataset was replaced and the index
+    is rebuilt.
+    """
+    first_key = str(df['link'].iloc[0]) if len(df) else None
+    with _listing_pool(path).transaction() as conn:
+        state = conn.execute("SELECT n_rows, first_key FROM listings_state WHERE id = 1").fetchone()
+        n_indexed = state[0] if state else 0
+        if state and (state[0] > len(df) or state[1] != first_key):
+            conn.execute("DELETE FROM listings_fts")
+            n_indexed = 0
+        new_rows = df.iloc[n_indexed:][LISTING_TEXT_COLUMNS]
+        conn.executemany(
+            "INSERT INTO listings_fts (rowid, society_name, property_name, features, nearby_locations) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (row_id, *(_as_text(value) for value in values))
+                for row_id, values in enumerate(new_rows.itertuples(index=False), start=n_indexed)
+            ),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO listings_state (id, n_rows, first_key) VALUES (1, ?, ?)", (len(df), first_key)
+        )
+    return len(new_rows)
+
+
+def search_listings(text, limit=50, path=LISTINGS_INDEX_PATH):
+    """Row ids of the listings matching ``text`` and their BM25 scores, best first.
+
+    Society and property names weigh twice as much as features / nearby places.
+    """
+    query = fts_query(text)
+    if query is None:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    with _listing_pool(path).connection() as conn:
+        rows = conn.execute(SEARCH_LISTINGS, (query, int(limit))).fetchall()
+    row_ids = np.array([row[0] for row in rows], dtype=np.int32)
+    scores = np.array([row[1] for row in rows], dtype=np.float32)
+    return row_ids, scores
@@ -0,0 +1,218 @@
+"""Sparse top-K similarity index for the property recommender.
+
+The dense cosine matrices are n x n float64 (~42 MB each for 2292 listings),
+but a recommendation only ever reads the best few neighbours of one row.
+We keep the K highest-scoring neighbours per row instead: an int32 array of
+neighbour row ids and a float32 array of their scores, sorted best first and
+with the row itself excluded.
+
+Each array is stored as a raw ``.npy`` file next to a ``manifest.json`` and
+opened with ``mmap_mode='r'``, so replicas on one host share the OS page
+cache instead of each deserialising a private copy. The app never builds
+the index itself: building it is a deploy step,
+
+    python -m utils.similarity_builder build
+
+which also writes the feature vectors the "Combined" strategy needs and
+stamps both with the same build id. The app refuses an index whose build id
+does not match the vectors, including one converted from the legacy dense
+pickles with ``python -m utils.similarity --k 50`` (kept for offline
+comparison only; its similarities are not the builder's).
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.fileio import atomic_write
+
+DATA_DIR = Path("datasets/page_2")
+INDEX_DIR = DATA_DIR / "similarity_index"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_PATH = INDEX_DIR / MANIFEST_NAME
+FORMAT_VERSION = 1
+DEFAULT_TOP_K = 50
+
+# Strategy name -> dense cosine matrix the index is built from.
+DENSE_MATRIX_FILES = {
+    "nearby_locations": "cosine_sim_by_near_by_locations.pkl",
+    "facility_based": "cosine_sim_facility_based.pkl",
+    "property_info_based": "cosine_sim_property_inof_based.pkl",
+}
+
+
+@dataclass(frozen=True)
+class TopKIndex:
+    indices: np.ndarray  # (n, k) int32 neighbour row ids, best first
+    scores: np.ndarray   # (n, k) float32 similarity of each neighbour
+
+    @property
+    def n_rows(self):
+        return self.indices.shape[0]
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.scores.nbytes
+
+    def neighbours(self, row, n=None):
+        """Return the ``n`` best (row ids, scores) for ``row``."""
+        return self.indices[row, :n], self.scores[row, :n]
+
+    def row_vector(self, row):
+        """Scatter one sparse row into a dense vector (zeros outside the top K)."""
+        out = np.zeros(self.n_rows, dtype=np.float32)
+        out[self.indices[row]] = self.scores[row]
+        return out
+
+
+def select_topk(ids, scores, k):
+    """Keep the ``k`` best (ids, scores) of each row, best first.
+
+    Ties are broken by lower id so builds are deterministic: every candidate
+    tied with a row's k-th best score is kept for the final sort, instead of
+    whichever of them ``argpartition`` happened to pick.
+    """
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)
+        kth = np.take_along_axis(scores, part[:, k - 1:k], axis=1)
+        width = int((scores >= kth).sum(axis=1).max())
+        if width > k:
+            part = np.argpartition(-scores, width - 1, axis=1)
+        ids = np.take_along_axis(ids, part[:, :width], axis=1)
+        scores = np.take_along_axis(scores, part[:, :width], axis=1)
+    order = np.lexsort((ids, -scores), axis=1)[:, :k]
+    return (
+        np.take_along_axis(ids, order, axis=1).astype(np.int32),
+        np.take_along_axis(scores, order, axis=1).astype(np.float32),
+    )
+
+
+def topk_of_block(block, k, row_offset):
+    """Top-``k`` columns of a block of similarity rows, excluding self.
+
+    Row ``i`` of ``block`` holds the similarities of corpus row
+    ``row_offset + i`` against every corpus row.
+    """
+    block = np.array(block, dtype=np.float64)
+    local = np.arange(block.shape[0])
+    block[local, local + row_offset] = -np.inf
+    ids = np.broadcast_to(np.arange(block.shape[1], dtype=np.int32), block.shape)
+    return select_topk(ids, block, k)
+
+
+def build_topk_index(sim_matrix, k=DEFAULT_TOP_K, chunk_size=512):
+    """Keep the ``k`` most similar rows (excluding self) of a square matrix.
+
+    Rows are processed in chunks so only ``chunk_size`` x n values are copied
+    at a time.
+    """
+    sim = np.asarray(sim_matrix)
+    n = sim.shape[0]
+    k = max(1, min(k, n - 1))
+
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        indices[start:stop], scores[start:stop] = topk_of_block(sim[start:stop], k, start)
+
+    return TopKIndex(indices, scores)
+
+
+def save_indexes(indexes, index_dir=INDEX_DIR, source="dense_pickles", build_id=None):
+    """Write each index as raw ``.npy`` arrays plus a sidecar manifest.
+
+    ``source`` and ``build_id`` are recorded in the manifest so readers can
+    tell which feature vectors (if any) the index was built from.
+
+    Each file is written under a unique temporary name and swapped in with
+    ``os.replace``; the manifest goes last so readers never see a
+    half-written index.
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    strategies = {}
+    for name, index in indexes.items():
+        entry = {"n_rows": index.n_rows, "k": index.k}
+        for field in ("indices", "scores"):
+            array = np.ascontiguousarray(getattr(index, field))
+            file_name = f"{name}.{field}.npy"
+            with atomic_write(index_dir / file_name) as f:
+                np.save(f, array)
+            entry[field] = {"file": file_name, "dtype": array.dtype.str}
+        strategies[name] = entry
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": source,
+        "build_id": build_id,
+        "strategies": strategies,
+    }
+    with atomic_write(index_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    index_dir = Path(index_dir)
+    if not (index_dir / MANIFEST_NAME).exists():
+        raise FileNotFoundError(
+            f"No similarity index in {index_dir}; run 'python -m utils.similarity_builder build' first"
+        )
+    manifest = json.loads((index_dir / MANIFEST_NAME).read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported similarity index format: {manifest.get('format_version')}")
+    return manifest
+
+
+def load_indexes(index_dir=INDEX_DIR, mmap_mode="r"):
+    """Open every index listed in the manifest, memory-mapped by default."""
+    index_dir = Path(index_dir)
+    manifest = load_manifest(index_dir)
+
+    indexes = {}
+    for name, entry in manifest["strategies"].items():
+        arrays = {}
+        for field in ("indices", "scores"):
+            array = np.load(index_dir / entry[field]["file"], mmap_mode=mmap_mode)
+            if array.shape != (entry["n_rows"], entry["k"]) or array.dtype.str != entry[field]["dtype"]:
+                raise ValueError(f"{name}.{field} does not match the manifest")
+            arrays[field] = array
+        indexes[name] = TopKIndex(**arrays)
+    return indexes
+
+
+def build_indexes_from_dense(data_dir=DATA_DIR, k=DEFAULT_TOP_K):
+    indexes = {}
+    for name, file_name in DENSE_MATRIX_FILES.items():
+        dense = pd.read_pickle(Path(data_dir) / file_name)
+        indexes[name] = build_topk_index(dense, k=k)
+        del dense
+    return indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the dense cosine pickles into the memory-mapped top-K index."
+    )
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K, help="neighbours kept per row")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--output", type=Path, default=INDEX_DIR, help="index directory")
+    args = parser.parse_args()
+
+    indexes = build_indexes_from_dense(args.data_dir, k=args.k)
+    save_indexes(indexes, args.output)
+    for name, index in indexes.items():
+        print(f"{name}: {index.n_rows} rows x top {index.k} -> {index.nbytes / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Build the recommender similarity index from the listings themselves.
+
+Three feature spaces are derived from ``Recomendation_system_final_data``:
+
+- ``nearby_locations``: multi-hot vector of the listed nearby places
+- ``facility_based``: multi-hot vector of the society features/amenities
+- ``property_info_based``: standardised price, size and luxury columns
+
+Rows are L2-normalised so cosine similarity is a dot product. The encoded
+feature spaces (vocabularies, scaler constants and row vectors) are saved
+next to the top-K index so new listings can be appended later: only the
+new rows are compared against the corpus (O(new x n)) and merged into the
+existing neighbour lists.
+
+    python -m utils.similarity_builder build
+    python -m utils.similarity_builder append new_listings.csv
+"""
+import argparse
+import json
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.datastore import DATASETS, parse_list, read_dataset
+from utils.fileio import atomic_write
+from utils.similarity import (
+    DEFAULT_TOP_K, INDEX_DIR, TopKIndex, load_indexes, save_indexes, select_topk, topk_of_block,
+)
+
+FEATURES_DIR_NAME = "features"
+# Recorded in the index manifest, with the build id shared by the feature vectors
+INDEX_SOURCE = "listings"
+
+# Strategy -> column holding a stringified list of tokens
+LIST_COLUMNS = {
+    "nearby_locations": "nearby_locations",
+    "facility_based": "features",
+}
+NUMERIC_COLUMNS = ['price', 'price_per_sqft', 'bedrooms', 'bathrooms', 'built_up_area', 'luxury_score']
+
+
+def encode_lists(values, vocabulary):
+    """Multi-hot encode token lists as L2-normalised CSR rows.
+
+    Unseen tokens are appended to ``vocabulary`` (token -> column) in place,
+    which leaves the vectors of already-encoded rows unchanged.
+    """
+    indptr, columns = [0], []
+    for value in values:
+        tokens = [token.lower() for token in parse_list(value)]
+        row = {vocabulary.setdefault(token, len(vocabulary)) for token in tokens}
+        columns.extend(sorted(row))
+        indptr.append(len(columns))
+
+    counts = np.diff(indptr)
+    data = np.repeat(1.0 / np.sqrt(np.maximum(counts, 1)), counts).astype(np.float32)
+    return sparse.csr_matrix((data, columns, indptr), shape=(len(indptr) - 1, len(vocabulary)))
+
+
+def encode_numeric(df, mean, std):
+    values = (df[NUMERIC_COLUMNS].to_numpy(dtype=np.float64) - mean) / std
+    values = np.nan_to_num(values)
+    norms = np.linalg.norm(values, axis=1, keepdims=True)
+    return (values / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def _widen(matrix, width):
+    """Pad a CSR matrix with empty columns for tokens added to the vocabulary."""
+    matrix = sparse.csr_matrix(matrix, copy=True)
+    matrix.resize((matrix.shape[0], width))
+    return matrix
+
+
+def _similarity_block(rows, corpus):
+    """Dense cosine similarities of ``rows`` against every row of ``corpus``."""
+    if sparse.issparse(rows):
+        width = max(rows.shape[1], corpus.shape[1])
+        return (_widen(rows, width) @ _widen(corpus, width).T).toarray()
+    return rows @ corpus.T
+
+
+# --- Feature spaces ---
+def fit_feature_spaces(df):
+    """Encode every listing; returns (state, {strategy: row vectors})."""
+    numeric = df[NUMERIC_COLUMNS].to_numpy(dtype=np.float64)
+    std = np.nanstd(numeric, axis=0)
+    state = {
+        "vocabularies": {name: {} for name in LIST_COLUMNS},
+        "numeric_mean": np.nanmean(numeric, axis=0).tolist(),
+        "numeric_std": np.where(std > 0, std, 1.0).tolist(),
+    }
+    return state, encode_feature_spaces(state, df)
+
+
+def encode_feature_spaces(state, df):
+    vectors = {
+        name: encode_lists(df[column].tolist(), state["vocabularies"][name])
+        for name, column in LIST_COLUMNS.items()
+    }
+    vectors["property_info_based"] = encode_numeric(
+        df, np.array(state["numeric_mean"]), np.array(state["numeric_std"])
+    )
+    return vectors
+
+
+def save_feature_spaces(state, vectors, index_dir=INDEX_DIR):
+    features_dir = Path(index_dir) / FEATURES_DIR_NAME
+    features_dir.mkdir(parents=True, exist_ok=True)
+    for name, matrix in vectors.items():
+        if sparse.issparse(matrix):
+            with atomic_write(features_dir / f"{name}.npz") as f:
+                sparse.save_npz(f, matrix.tocsr())
+        else:
+            with atomic_write(features_dir / f"{name}.npy") as f:
+                np.save(f, matrix)
+    with atomic_write(features_dir / "state.json", "w") as f:
+        json.dump(state, f)
+
+
+def load_feature_spaces(index_dir=INDEX_DIR, mmap_mode=None):
+    features_dir = Path(index_dir) / FEATURES_DIR_NAME
+    state_path = features_dir / "state.json"
+    if not state_path.exists():
+        raise FileNotFoundError(
+            f"No feature spaces in {features_dir}; run 'python -m utils.similarity_builder build' first"
+        )
+    state = json.loads(state_path.read_text())
+    vectors = {name: sparse.load_npz(features_dir / f"{name}.npz") for name in LIST_COLUMNS}
+    vectors["property_info_based"] = np.load(features_dir / "property_info_based.npy", mmap_mode=mmap_mode)
+    return state, vectors
+
+
+# --- Index builds ---
+def build_similarity_index(df, k=DEFAULT_TOP_K, chunk_size=512):
+    """Full O(n^2) build of every strategy's top-K index from the listings."""
+    state, vectors = fit_feature_spaces(df)
+    n = len(df)
+    k = max(1, min(k, n - 1))
+
+    indexes = {}
+    for name, matrix in vectors.items():
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            block = _similarity_block(matrix[start:stop], matrix)
+            indices[start:stop], scores[start:stop] = topk_of_block(block, k, start)
+        indexes[name] = TopKIndex(indices, scores)
+    return indexes, state, vectors
+
+
+def append_to_index(index, old_vectors, new_vectors, chunk_size=512):
+    """Add new rows to a top-K index without recomputing existing pairs.
+
+    New rows are scored against the whole corpus; existing rows only need
+    their neighbour lists merged with the new rows' scores.
+    """
+    n_old, n_new = old_vectors.shape[0], new_vectors.shape[0]
+    if sparse.issparse(new_vectors):
+        corpus = sparse.vstack([_widen(old_vectors, new_vectors.shape[1]), new_vectors]).tocsr()
+    else:
+        corpus = np.vstack([old_vectors, new_vectors])
+    k = index.k
+
+    new_indices = np.empty((n_new, k), dtype=np.int32)
+    new_scores = np.empty((n_new, k), dtype=np.float32)
+    old_indices, old_scores = np.array(index.indices), np.array(index.scores)
+    new_ids = np.arange(n_old, n_old + n_new, dtype=np.int32)
+    for start in range(0, n_new, chunk_size):
+        stop = min(start + chunk_size, n_new)
+        block = _similarity_block(new_vectors[start:stop], corpus)
+        new_indices[start:stop], new_scores[start:stop] = topk_of_block(block, k, n_old + start)
+
+        # Existing rows: merge their current neighbours with this chunk of new rows
+        candidate_ids = np.hstack([old_indices, np.broadcast_to(new_ids[start:stop], (n_old, stop - start))])
+        candidate_scores = np.hstack([old_scores, block[:, :n_old].T.astype(np.float32)])
+        old_indices, old_scores = select_topk(candidate_ids, candidate_scores, k)
+
+    return TopKIndex(np.vstack([old_indices, new_indices]), np.vstack([old_scores, new_scores]))
+
+
+def build(listings_path=DATASETS["recommendation"], index_dir=INDEX_DIR, k=DEFAULT_TOP_K):
+    df = read_dataset("recommendation") if listings_path == DATASETS["recommendation"] else pd.read_csv(listings_path)
+    indexes, state, vectors = build_similarity_index(df, k=k)
+    state["build_id"] = uuid.uuid4().hex
+    save_feature_spaces(state, vectors, index_dir)
+    save_indexes(indexes, index_dir, source=INDEX_SOURCE, build_id=state["build_id"])
+    return indexes
+
+
+def append_listings(new_df, listings_path=DATASETS["recommendation"], index_dir=INDEX_DIR):
+    """Append new listings to the dataset and update the index in O(new x n).
+
+    Everything that can fail is checked, and the CSV rows are rendered,
+    before anything is written.
+    """
+    state, vectors = load_feature_spaces(index_dir)
+    indexes = load_indexes(index_dir, mmap_mode=None)
+    listings_columns = pd.read_csv(listings_path, nrows=0).columns
+    missing = [
+        col for col in dict.fromkeys([*listings_columns, *NUMERIC_COLUMNS, *LIST_COLUMNS.values()])
+        if col not in new_df.columns
+    ]
+    if missing:
+        raise ValueError(f"New listings are missing columns: {', '.join(missing)}")
+    blank = new_df['society_name'].isna() | new_df['society_name'].astype(str).str.strip().eq("")
+    if blank.any():
+        raise ValueError(f"New listings at rows {list(new_df.index[blank])} have no society_name")
+    n_old = vectors["property_info_based"].shape[0]
+    n_listed = len(pd.read_csv(listings_path, usecols=[0]))
+    if any(index.n_rows != n_old for index in indexes.values()) or n_listed != n_old:
+        raise ValueError("Listings, similarity index and feature spaces are out of sync; rebuild the index")
+    new_rows = new_df[listings_columns].to_csv(header=False, index=False)
+
+    new_vectors = encode_feature_spaces(state, new_df)
+    updated = {
+        name: append_to_index(indexes[name], vectors[name], new_vectors[name])
+        for name in indexes
+    }
+    for name, matrix in new_vectors.items():
+        if sparse.issparse(matrix):
+            vectors[name] = sparse.vstack([_widen(vectors[name], matrix.shape[1]), matrix]).tocsr()
+        else:
+            vectors[name] = np.vstack([vectors[name], matrix])
+
+    # Dataset last: readers check that it has as many rows as the index
+    state["build_id"] = uuid.uuid4().hex
+    save_feature_spaces(state, vectors, index_dir)
+    save_indexes(updated, index_dir, source=INDEX_SOURCE, build_id=state["build_id"])
+    with open(listings_path, "a", newline="") as f:
+        f.write(new_rows)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or extend the recommender similarity index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="full rebuild from the listings dataset")
+    build_parser.add_argument("--k", type=int, default=DEFAULT_TOP_K, help="neighbours kept per row")
+    append_parser = subparsers.add_parser("append", help="append new listings from a CSV file")
+    append_parser.add_argument("csv", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        indexes = build(k=args.k)
+    else:
+        indexes = append_listings(pd.read_csv(args.csv))
+    for name, index in indexes.items():
+        print(f"{name}: {index.n_rows} rows x top {index.k}")
+
+
+if __name__ == "__main__":
+    main()
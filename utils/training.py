@@ -0,0 +1,288 @@
+"""Reproducible training for the price prediction model.
+
+Trains the same preprocessing + XGBoost pipeline the app serves, on the real
+listing prices in ``analystics_module_data``:
+
+- deterministic seed for the folds, the early-stopping splits and XGBoost
+- k-fold cross-validation with the folds trained in parallel
+- ``tree_method='hist'`` with early stopping on a held-out slice of each fold
+- final refit on all rows with the median best iteration from CV
+- a multi-quantile head (P10/P50/P90) trained on the same preprocessed
+  features, so the app can serve price bands from one feature matrix; it is
+  early-stopped on its own and its outer band is conformally calibrated on a
+  held-out split, and bands that still miss their nominal coverage on
+  held-out rows are not registered
+- a JSON report with fit time, inference latency and R^2 / MAE
+
+    python -m utils.training --folds 5 --jobs -1 --register --activate
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBRegressor
+
+from utils import model_registry
+from utils.feature_schema import build_schema, save_schema
+from utils.prediction import FEATURE_COLUMNS, MODEL_PATH, CompiledPredictor, model_version
+
+DATA_PATH = Path("datasets/page_3/analystics_module_data.xls")
+REPORT_PATH = Path("datasets/page_1/training_report.json")
+
+CATEGORICAL_COLUMNS = ['location', 'floor_category', 'luxury_category',
+                       'furnishing_status', 'flooring_type', 'parking_space',
+                       'age_of_property', 'balconies']
+NUMERICAL_COLUMNS = ['bedrooms', 'bathrooms',
+                     'built_up_area', 'storage_room', 'pooja_room']
+
+# The page collects balconies as a count
+BALCONY_COUNTS = {'no balcony': 0, '1 balcony': 1, '2 balconies': 2, '3 balconies': 3, '3+ balconies': 4}
+
+XGB_PARAMS = {
+    "tree_method": "hist",
+    "n_estimators": 2000,
+    "learning_rate": 0.05,
+    "max_depth": 6,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}
+EARLY_STOPPING_ROUNDS = 50
+QUANTILES = [0.1, 0.5, 0.9]
+# Share of prices the outermost band should contain (P10-P90 -> 80%)
+NOMINAL_COVERAGE = QUANTILES[-1] - QUANTILES[0]
+# Rows held out to calibrate the band width
+CALIBRATION_SIZE = 0.2
+# Bands covering less than nominal minus this on held-out rows are not registered
+COVERAGE_TOLERANCE = 0.02
+
+
+def load_training_data(path=DATA_PATH):
+    """Features and log price from the listing-level analytics dataset."""
+    df = pd.read_csv(path)
+    if not pd.api.types.is_numeric_dtype(df['balconies']):
+        df['balconies'] = df['balconies'].map(BALCONY_COUNTS)
+    df = df.dropna(subset=FEATURE_COLUMNS + ['price'])
+    return df[FEATURE_COLUMNS].reset_index(drop=True), np.log(df['price'].to_numpy())
+
+
+def make_preprocessor():
+    return ColumnTransformer(transformers=[
+        ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_COLUMNS),
+        ('num', StandardScaler(), NUMERICAL_COLUMNS)
+    ])
+
+
+def fit_with_early_stopping(X, y, seed, n_jobs):
+    """Fit on ``X``, early-stopping on a seeded 10% slice of it."""
+    X_fit, X_stop, y_fit, y_stop = train_test_split(X, y, test_size=0.1, random_state=seed)
+    preprocessor = make_preprocessor().fit(X_fit)
+    regressor = XGBRegressor(
+        **XGB_PARAMS, early_stopping_rounds=EARLY_STOPPING_ROUNDS, random_state=seed, n_jobs=n_jobs
+    )
+    regressor.fit(
+        preprocessor.transform(X_fit), y_fit,
+        eval_set=[(preprocessor.transform(X_stop), y_stop)], verbose=False
+    )
+    return Pipeline(steps=[('preprocessor', preprocessor), ('regressor', regressor)])
+
+
+def fit_quantile_head(preprocessor, X, y, seed, n_jobs):
+    """One multi-quantile booster over the already-fitted preprocessor's output.
+
+    The head is early-stopped on its own 10% slice, then its outermost band is
+    calibrated on a held-out split (conformalised quantile regression).
+    Returns (regressor, band offset in log price).
+    """
+    X_fit, X_cal, y_fit, y_cal = train_test_split(X, y, test_size=CALIBRATION_SIZE, random_state=seed)
+    X_fit, X_stop, y_fit, y_stop = train_test_split(X_fit, y_fit, test_size=0.1, random_state=seed)
+    regressor = XGBRegressor(
+        **XGB_PARAMS, objective="reg:quantileerror", quantile_alpha=np.array(QUANTILES),
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS, random_state=seed, n_jobs=n_jobs
+    )
+    regressor.fit(
+        preprocessor.transform(X_fit), y_fit,
+        eval_set=[(preprocessor.transform(X_stop), y_stop)], verbose=False
+    )
+    return regressor, conformal_offset(_predict_bands(regressor, preprocessor, X_cal), y_cal)
+
+
+def _predict_bands(regressor, preprocessor, X, offset=0.0):
+    bands = np.sort(np.reshape(regressor.predict(preprocessor.transform(X)), (len(X), -1)), axis=1)
+    bands[:, 0] -= offset
+    bands[:, -1] += offset
+    return bands
+
+
+def conformal_offset(bands, y, coverage=NOMINAL_COVERAGE):
+    """Amount to widen (or narrow) the outermost band so it contains ``coverage`` of ``y``.
+
+    ``bands`` are uncalibrated predictions for held-out rows; the offset is
+    the finite-sample conformal quantile of how far each price falls outside.
+    """
+    scores = np.maximum(bands[:, 0] - y, y - bands[:, -1])
+    level = min(1.0, np.ceil((len(y) + 1) * coverage) / len(y))
+    return float(np.quantile(scores, level, method="higher"))
+
+
+def band_coverage(X, y, folds, seed, n_jobs):
+    """Share of prices inside the calibrated outermost band, each row scored
+    by a head fit on the other folds (one held-out split is too noisy to gate on)."""
+    inside = np.zeros(len(y), dtype=bool)
+    for train_idx, test_idx in KFold(n_splits=folds, shuffle=True, random_state=seed).split(X):
+        preprocessor = make_preprocessor().fit(X.iloc[train_idx])
+        head, offset = fit_quantile_head(preprocessor, X.iloc[train_idx], y[train_idx], seed, n_jobs)
+        bands = _predict_bands(head, preprocessor, X.iloc[test_idx], offset)
+        inside[test_idx] = (y[test_idx] >= bands[:, 0]) & (y[test_idx] <= bands[:, -1])
+    return float(inside.mean())
+
+
+def _score(y_true_log, y_pred_log):
+    return {
+        "r2": float(r2_score(y_true_log, y_pred_log)),
+        "mae_log": float(mean_absolute_error(y_true_log, y_pred_log)),
+        "mae_crores": float(mean_absolute_error(np.exp(y_true_log), np.exp(y_pred_log))),
+    }
+
+
+def _run_fold(fold, X, y, train_idx, test_idx, seed, n_jobs):
+    start = time.perf_counter()
+    pipeline = fit_with_early_stopping(X.iloc[train_idx], y[train_idx], seed + fold, n_jobs)
+    fit_seconds = time.perf_counter() - start
+    scores = _score(y[test_idx], pipeline.predict(X.iloc[test_idx]))
+    best_iteration = int(pipeline.named_steps['regressor'].best_iteration)
+    return {"fold": fold, "fit_seconds": fit_seconds, "best_iteration": best_iteration, **scores}
+
+
+def cross_validate(X, y, folds=5, seed=42, jobs=-1):
+    """K-fold CV with folds trained in parallel and XGBoost threads split between them."""
+    n_workers = min(folds, os.cpu_count() or 1) if jobs == -1 else max(1, min(jobs, folds))
+    threads_per_fold = max(1, (os.cpu_count() or 1) // n_workers)
+    splits = KFold(n_splits=folds, shuffle=True, random_state=seed).split(X)
+    return Parallel(n_jobs=n_workers)(
+        delayed(_run_fold)(fold, X, y, train_idx, test_idx, seed, threads_per_fold)
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+
+
+def measure_latency(pipeline, X, quantile_head=None, band_offset=0.0, repeats=200):
+    """Median single-row latency (ms) of the pipeline and the compiled fast path."""
+    rows = X.sample(min(repeats, len(X)), random_state=0)
+    predictor = CompiledPredictor.from_pipeline(pipeline, quantile_head, band_offset)
+
+    def median_ms(fn, items):
+        timings = []
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1000)
+
+    start = time.perf_counter()
+    pipeline.predict(X)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "pipeline_single_row_ms": median_ms(pipeline.predict, [rows.iloc[[i]] for i in range(len(rows))]),
+        "compiled_single_row_ms": median_ms(predictor.predict, rows.to_dict("records")),
+        "compiled_with_bands_ms": median_ms(predictor.predict_with_bands, rows.to_dict("records")),
+        "batch_rows_per_second": float(len(X) / batch_seconds),
+    }
+
+
+def train(data_path=DATA_PATH, folds=5, seed=42, jobs=-1):
+    """Cross-validate, refit on all rows and return (pipeline, (quantile head, band offset), report, X)."""
+    X, y = load_training_data(data_path)
+    cv = cross_validate(X, y, folds, seed, jobs)
+    n_estimators = int(np.median([fold["best_iteration"] for fold in cv])) + 1
+
+    start = time.perf_counter()
+    pipeline = Pipeline(steps=[
+        ('preprocessor', make_preprocessor()),
+        ('regressor', XGBRegressor(**{**XGB_PARAMS, "n_estimators": n_estimators},
+                                   random_state=seed, n_jobs=os.cpu_count()))
+    ])
+    pipeline.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+    quantile_head, band_offset = fit_quantile_head(pipeline.named_steps['preprocessor'], X, y, seed, os.cpu_count())
+
+    report = {
+        "data": str(data_path),
+        "rows": len(X),
+        "seed": seed,
+        "folds": folds,
+        "params": {**XGB_PARAMS, "n_estimators": n_estimators},
+        "cv": {
+            metric: {
+                "mean": float(np.mean([fold[metric] for fold in cv])),
+                "std": float(np.std([fold[metric] for fold in cv])),
+            }
+            for metric in ("r2", "mae_log", "mae_crores")
+        },
+        "cv_folds": cv,
+        "fit_seconds": fit_seconds,
+        "quantiles": QUANTILES,
+        "quantile_n_estimators": int(quantile_head.best_iteration) + 1,
+        "band_offset": band_offset,
+        "nominal_coverage": NOMINAL_COVERAGE,
+        "band_coverage": band_coverage(X, y, folds, seed, os.cpu_count()),
+        "latency": measure_latency(pipeline, X, quantile_head, band_offset),
+    }
+    return pipeline, (quantile_head, band_offset), report, X
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the price prediction model.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=-1, help="folds trained in parallel (-1 = all cores)")
+    parser.add_argument("--output", type=Path, default=MODEL_PATH, help="pickled pipeline path")
+    parser.add_argument("--report", type=Path, default=REPORT_PATH)
+    parser.add_argument("--register", action="store_true", help="also export to the model registry")
+    parser.add_argument("--activate", action="store_true", help="activate the registered version")
+    args = parser.parse_args()
+
+    pipeline, (quantile_head, band_offset), report, X = train(args.data, args.folds, args.seed, args.jobs)
+    report["bands_registered"] = report["band_coverage"] >= NOMINAL_COVERAGE - COVERAGE_TOLERANCE
+
+    with open(args.output, "wb") as f:
+        pickle.dump(pipeline, f)
+    report["model_version"] = model_version(args.output)
+    schema = build_schema(X)
+    save_schema(schema)
+    if args.register or args.activate:
+        version = model_registry.export_pipeline(
+            pipeline, metadata=report, check_df=X.sample(min(500, len(X)), random_state=0),
+            quantile_regressor=quantile_head if report["bands_registered"] else None, band_offset=band_offset,
+            schema=schema,
+        )
+        report["registry_version"] = version
+        if args.activate:
+            model_registry.activate(version)
+    args.report.write_text(json.dumps(report, indent=2))
+
+    cv = report["cv"]
+    print(f"CV R²: {cv['r2']['mean']:.4f} ± {cv['r2']['std']:.4f}")
+    print(f"CV MAE: {cv['mae_crores']['mean']:.3f} Cr ({cv['mae_log']['mean']:.3f} log)")
+    print(f"Final fit: {report['fit_seconds']:.2f}s, {report['params']['n_estimators']} trees")
+    print(f"P10-P90 band coverage across CV folds: {report['band_coverage']:.1%} "
+          f"(nominal {NOMINAL_COVERAGE:.0%})")
+    if not report["bands_registered"]:
+        print("⚠️ Band coverage misses nominal; price bands were not registered")
+    print(f"Latency: {report['latency']['compiled_single_row_ms']:.3f} ms/row compiled, "
+          f"{report['latency']['pipeline_single_row_ms']:.3f} ms/row pipeline")
+    print(f"✅ Model saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()